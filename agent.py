@@ -0,0 +1,120 @@
+"""Agent loop: sends the user's message and resolves the model's function calls until it answers."""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import google.generativeai as genai
+
+import config
+import encoding
+import tracing
+from result_cache import ResultCache, normalize_args
+from tools import ToolResult, registry
+
+_executor = ThreadPoolExecutor(max_workers=config.TOOL_WORKERS, thread_name_prefix='tool')
+
+# Tool results keyed by (dataset hash, tool name, arguments); shared by all sessions of the process.
+tool_cache = ResultCache(config.TOOL_CACHE_MB)
+
+
+def function_calls(response):
+    """Returns every function call requested in a model response."""
+    return [part.function_call for part in response.candidates[0].content.parts if part.function_call]
+
+
+def _result_size(result):
+    """Approximate memory held by a tool result, in bytes."""
+    return len(str(result.content)) + len(result.chart or b'')
+
+
+def _call_tool(name, dataset, args):
+    if name not in registry:
+        return ToolResult(f"Error: Function '{name}' not found.")
+    key = (dataset.key, name, normalize_args(args))
+    with tracing.span(f'tool:{name}', args=args) as record:
+        result = tool_cache.get(key)
+        record['cached'] = result is not None
+        if result is None:
+            try:
+                result = registry.dispatch(name, dataset, args)
+            except Exception as e:
+                record['error'] = repr(e)
+                return ToolResult(f"Error: {e}")
+            # Results are cached as sent to the model: compact JSON values within the token budget.
+            result = result._replace(content=encoding.encode(result.content))
+            tool_cache.put(key, result, _result_size(result))
+        record['result_tokens'] = encoding.size_tokens(result.content)
+    return result
+
+
+def run_function_calls(calls, dataset):
+    """Runs the function calls of one model turn concurrently and returns their results in call order.
+
+    Tools only compute; charts come back as PNG bytes and are displayed by the
+    caller on the script thread.
+    """
+    futures = [tracing.submit(_executor, _call_tool, call.name, dataset, dict(call.args)) for call in calls]
+    return [(call.name, future.result()) for call, future in zip(calls, futures)]
+
+
+def function_responses(results):
+    """Packs tool results into the parts of a single reply to the model."""
+    return [
+        genai.protos.Part(function_response={'name': name, 'response': {'result': result.content}})
+        for name, result in results
+    ]
+
+
+def _payload_bytes(content):
+    """Serialized size of a message: a prompt string or a list of parts."""
+    if isinstance(content, str):
+        return len(content.encode('utf-8'))
+    return sum(genai.protos.Part.pb(part).ByteSize() for part in content)
+
+
+def _chunk_text(chunk):
+    """Text carried by a streamed chunk; function-call chunks carry none."""
+    return ''.join(part.text for part in chunk.parts)
+
+
+def send(chat, content, stream=False, on_text=None):
+    """Sends `content` to the model, optionally streaming and reporting text as it arrives.
+
+    A streamed response is fully consumed before returning, so its function calls
+    and text are available as on a regular response.
+    """
+    # Retries are counted per chat, so this call's are the difference across it.
+    retries_before = getattr(chat, 'retries', 0)
+    with tracing.span('llm.send_message', stream=stream, request_bytes=_payload_bytes(content)) as record:
+        if not stream:
+            response = chat.send_message(content)
+        else:
+            start = time.perf_counter()
+            response = chat.send_message(content, stream=True)
+            for chunk in response:
+                text = _chunk_text(chunk)
+                if text and on_text:
+                    record.setdefault('first_text_ms', (time.perf_counter() - start) * 1000)
+                    on_text(text)
+        if getattr(chat, 'retries', 0) > retries_before:
+            record['retries'] = chat.retries - retries_before
+        usage = response.usage_metadata
+        record['prompt_tokens'] = usage.prompt_token_count
+        record['response_tokens'] = usage.candidates_token_count
+    return response
+
+
+def run_turn(chat, message, dataset, on_result=None, stream=False, on_text=None):
+    """Sends `message` and answers function calls until the model replies with text.
+
+    `on_result(name, result)` is called on the calling thread for every tool result,
+    e.g. to display its figure. With `stream=True`, `on_text(text)` receives each
+    piece of model text as it is generated. Returns the final response text.
+    """
+    response = send(chat, message, stream, on_text)
+    while calls := function_calls(response):
+        results = run_function_calls(calls, dataset)
+        if on_result:
+            for name, result in results:
+                on_result(name, result)
+        response = send(chat, function_responses(results), stream, on_text)
+    return response.text
@@ -7,7 +7,7 @@ Original file is located at
     https://colab.research.google.com/drive/1SyV2P95tmfFATNnD8-a8UMb5IwDyyYTP
 
 # Task
-Criar um arquivo de amostra chamado "creditcard_sample.csv" contendo as primeiras 50.000 linhas do arquivo "Kaggle - Credit Card Fraud.zip" para análise exploratória inicial.
+Criar um arquivo de amostra chamado "creditcard_sample.csv" contendo uma amostra de 50.000 linhas, estratificada pela coluna 'Class', do arquivo "Kaggle - Credit Card Fraud.zip" para análise exploratória inicial.
 
 ## Carregar os dados
 
@@ -15,12 +15,16 @@ Criar um arquivo de amostra chamado "creditcard_sample.csv" contendo as primeira
 Carregar o arquivo `creditcard_sample.csv` em um DataFrame pandas.
 
 **Reasoning**:
-The subtask requires loading the first 50,000 rows of the CSV file into a pandas DataFrame. This involves importing pandas and using `pd.read_csv` with the `nrows` parameter.
+The first 50,000 rows of the file only cover the first hours of `Time` and hold very few fraud rows. Instead, `sampling.stratified_sample` reads the whole CSV in one streaming pass and keeps 50,000 rows stratified by `Class`, with at least 500 rows per class so that every fraud is kept. Fraud is over-represented in the sample; use `sample.weights()` or `sample.mean_interval()` to generalize to the full file.
 """
 
 import pandas as pd
 
-df = pd.read_csv('/content/creditcard.csv', nrows=50000)
+import sampling
+
+sample = sampling.stratified_sample('/content/creditcard.csv', 50000, by='Class', min_per_stratum=500)
+df = sample.df
+print(sample.describe())
 
 """## Explorar os dados iniciais
 
@@ -41,9 +45,13 @@ display(df.isnull().sum())
 Calcular e exibir estatísticas descritivas para as colunas numéricas, como média, mediana, desvio padrão, mínimo e máximo.
 
 **Reasoning**:
-Calculate and display descriptive statistics for all numerical columns in the DataFrame.
+Calculate and display descriptive statistics for all numerical columns. Since the stratified sample over-represents fraud, count, mean, standard deviation, minimum and maximum are computed over the full file with `streaming_stats.compute`, which reads the CSV in chunks in constant memory; the sample's own `describe()` adds the quartiles.
 """
 
+import streaming_stats
+
+full_moments = streaming_stats.compute('/content/creditcard.csv')
+display(full_moments.describe())
 display(df.describe())
 
 """## Análise da variável alvo (class)
@@ -52,12 +60,12 @@ display(df.describe())
 Verificar a distribuição da variável 'Class' (fraude vs. não fraude) e visualizar essa distribuição.
 
 **Reasoning**:
-Count the occurrences of each class in the 'Class' column and then visualize the distribution using a bar plot.
+Count the occurrences of each class in the 'Class' column and then visualize the distribution using a bar plot. The counts come from the whole file, recorded per stratum while sampling: the sample itself keeps every fraud and would overstate the fraud rate.
 """
 
 import matplotlib.pyplot as plt
 
-class_counts = df['Class'].value_counts()
+class_counts = pd.Series({value: stratum['population'] for value, stratum in sample.strata.items()}).sort_index()
 
 plt.figure(figsize=(6, 4))
 plt.bar(class_counts.index, class_counts.values, color=['skyblue', 'salmon'])
@@ -73,7 +81,7 @@ plt.show()
 Gerar histogramas ou gráficos de distribuição para algumas das variáveis para entender sua forma e dispersão.
 
 **Reasoning**:
-Create histograms for selected variables to understand their distributions.
+Create histograms for selected variables to understand their distributions. Each sampled row is weighted by the number of rows of its class it stands for (`sample.weights()`), so the histograms estimate the full file instead of the fraud-enriched sample.
 """
 
 import matplotlib.pyplot as plt
@@ -85,9 +93,10 @@ n_rows = (n_vars + n_cols - 1) // n_cols
 
 fig, axes = plt.subplots(n_rows, n_cols, figsize=(12, n_rows * 4))
 axes = axes.flatten()
+row_weights = sample.weights()
 
 for i, var in enumerate(selected_vars):
-    axes[i].hist(df[var], bins=50, color='skyblue', edgecolor='black')
+    axes[i].hist(df[var], bins=50, weights=row_weights, color='skyblue', edgecolor='black')
     axes[i].set_title(f'Distribuição de {var}')
     axes[i].set_xlabel('Valor da Variável')
     axes[i].set_ylabel('Frequência')
@@ -104,13 +113,13 @@ plt.show()
 Calcular e visualizar a matriz de correlação entre as variáveis numéricas para identificar relacionamentos.
 
 **Reasoning**:
-Calculate the correlation matrix and visualize it using a heatmap.
+Calculate the correlation matrix over the full file from the streamed moments (the sample would inflate correlations with 'Class') and visualize it using a heatmap.
 """
 
 import seaborn as sns
 import matplotlib.pyplot as plt
 
-correlation_matrix = df.corr()
+correlation_matrix = full_moments.correlation()
 
 plt.figure(figsize=(15, 12))
 sns.heatmap(correlation_matrix, cmap='coolwarm', annot=False)
@@ -123,7 +132,7 @@ plt.show()
 Investigar como as variáveis 'Time' e 'Amount' se relacionam com a variável 'Class' (fraude).
 
 **Reasoning**:
-Create scatter plots to visualize the relationship between 'Time' and 'Amount' for both fraudulent and non-fraudulent transactions, as specified in the instructions.
+Create a scatter plot to visualize the relationship between 'Time' and 'Amount' for both fraudulent and non-fraudulent transactions, as specified in the instructions. Non-fraudulent transactions are drawn as binned densities and fraudulent ones as points.
 """
 
 import matplotlib.pyplot as plt
@@ -131,22 +140,14 @@ import matplotlib.pyplot as plt
 fraud_df = df[df['Class'] == 1]
 non_fraud_df = df[df['Class'] == 0]
 
-plt.figure(figsize=(12, 5))
-
-plt.subplot(1, 2, 1)
-plt.scatter(non_fraud_df['Time'], non_fraud_df['Amount'], alpha=0.5, color='skyblue', s=1)
-plt.title('Non-Fraudulent Transactions (Class 0)')
-plt.xlabel('Time')
-plt.ylabel('Amount')
-
-plt.subplot(1, 2, 2)
-plt.scatter(fraud_df['Time'], fraud_df['Amount'], alpha=0.5, color='salmon', s=1)
-plt.title('Fraudulent Transactions (Class 1)')
-plt.xlabel('Time')
-plt.ylabel('Amount')
+import charts
+import dataset_profile
 
-plt.tight_layout()
-plt.show()
+# Non-fraud rows are binned into a density layer and fraud rows drawn as points, so the plot
+# takes the same time at any row count.
+profile = dataset_profile.DatasetProfile(df)
+display(charts.density_scatter(profile.density('Time', 'Amount', 'Class'), 'Time', 'Amount', 'Class',
+                               title='Time vs Amount by Class'))
 
 """## Conclusões iniciais
 
@@ -258,24 +259,8 @@ import seaborn as sns
 # V2 and V4 show positive correlation. Let's visualize some pairs.
 selected_pairs = [('V17', 'V14'), ('V12', 'V10'), ('V3', 'V2'), ('V4', 'V17')]
 
-n_pairs = len(selected_pairs)
-n_cols = 2
-n_rows = (n_pairs + n_cols - 1) // n_cols
-
-fig, axes = plt.subplots(n_rows, n_cols, figsize=(15, n_rows * 6))
-axes = axes.flatten()
-
-for i, (var1, var2) in enumerate(selected_pairs):
-    sns.scatterplot(x=var1, y=var2, hue='Class', data=df, ax=axes[i], alpha=0.6, s=5, palette='viridis', legend='full')
-    axes[i].set_title(f'Scatter plot of {var1} vs {var2} by Class')
-    axes[i].set_xlabel(var1)
-    axes[i].set_ylabel(var2)
-
-for j in range(i + 1, len(axes)):
-    fig.delaxes(axes[j])
-
-plt.tight_layout()
-plt.show()
+panels = [(profile.density(var1, var2, 'Class'), var1, var2) for var1, var2 in selected_pairs]
+display(charts.density_grid(panels, hue='Class'))
 
 """## Conclusões iniciais
 
@@ -354,11 +339,16 @@ Generate a treated version of the "creditcard_sample.csv" file, addressing outli
 Identificar e tratar outliers na coluna 'Amount' usando um método apropriado (por exemplo, usando o método do IQR).
 
 **Reasoning**:
-Calculate the IQR and define the outlier bounds for the 'Amount' column, then filter the DataFrame to remove rows with outliers based on these bounds.
+Calculate the IQR and define the outlier bounds for the 'Amount' column, then filter the DataFrame to remove rows with outliers based on these bounds. The quartiles come from a KLL quantile sketch of the full file, built in one streaming pass without sorting the column, so the bounds reflect all transactions rather than the stratified sample.
 """
 
-Q1 = df['Amount'].quantile(0.25)
-Q3 = df['Amount'].quantile(0.75)
+import ingestion
+import quantile_sketch
+
+amount_sketch = quantile_sketch.KLLSketch()
+for chunk in ingestion.iter_chunks('/content/creditcard.csv'):
+    amount_sketch.update(chunk['Amount'].to_numpy())
+Q1, Q3 = amount_sketch.quantiles([0.25, 0.75])
 IQR = Q3 - Q1
 
 lower_bound = Q1 - 1.5 * IQR
@@ -372,20 +362,21 @@ print(f"DataFrame shape after removing outliers in 'Amount': {df_tratado.shape}"
 """## Seleção de features
 
 ### Subtask:
-Selecionar as variáveis mais relevantes com base na análise de correlação com a variável 'Class' e nas visualizações geradas anteriormente.
+Selecionar as variáveis mais relevantes com base em um ranking automático (correlação ponto-bisserial, informação mútua e AUC) em relação à variável 'Class'.
 
 **Reasoning**:
-Identify and select the relevant columns based on correlation analysis and visualizations, create a new DataFrame with these selected features, and display its head and info to verify the selection.
+Rank the columns against 'Class', select the best ones, create a new DataFrame with these selected features, and display its head and info to verify the selection.
 """
 
-# Columns to exclude: 'Time' and 'V' columns with low correlation to 'Class'
-# Based on correlation matrix and box plots, 'Time' and some 'V' variables have low correlation.
-# Variables V1, V5, V6, V8, V9, V11, V13, V15, V18, V19, V20, V21, V22, V23, V24, V25, V26, V27, V28
-# seem to have relatively lower correlation or less distinct separation in box plots compared to others.
-# Let's keep 'Amount' and the 'V' variables with higher correlation and distinct distributions (V2, V3, V4, V7, V10, V12, V14, V16, V17).
-# We also need to keep the 'Class' column.
+# Rank every column against 'Class' (point-biserial correlation, mutual information and AUC)
+# instead of picking features by eye from the heatmap and box plots; the 10 best are kept with 'Amount'.
+import feature_ranking
+
+ranking = feature_ranking.rank_features(feature_ranking.class_sample(df_tratado, 'Class', 50000).df, 'Class')
+display(ranking.head(15))
 
-cols_to_keep = ['Class', 'Amount', 'V2', 'V3', 'V4', 'V7', 'V10', 'V12', 'V14', 'V16', 'V17']
+top_features = [feature for feature in ranking.index if feature != 'Amount'][:10]
+cols_to_keep = ['Class', 'Amount'] + top_features
 
 # Create the new DataFrame with selected features
 df_features_selecionadas = df_tratado[cols_to_keep].copy()
@@ -1,23 +1,25 @@
 import streamlit as st
-import pandas as pd
-import google.generativeai as genai
-import json
-import os
-import numpy as np
-from google.generativeai.types import FunctionDeclaration, Tool
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+import config
+import dataset_store
+import history
+import localization
+import tracing
+import warmup
+
+# Modules pulling in pandas, pyarrow, matplotlib or the Gemini SDK are imported where
+# they are first needed, so the page renders before they load; Streamlit keeps them
+# loaded across reruns.
 
 # --- Page and App Setup ---
 st.set_page_config(layout="wide", page_title="CSV Analysis Agent")
 
 # --- Localization ---
-def load_language(language):
-    """Loads the language JSON file."""
-    with open(f'locales/{language}.json', 'r', encoding='utf-8') as f:
-        return json.load(f)
-
 if 'language' not in st.session_state:
     st.session_state.language = 'pt'
-lang = load_language(st.session_state.language)
+lang = localization.load_language(st.session_state.language)
 
 # --- UI Components ---
 st.sidebar.title(lang['settings'])
@@ -46,37 +48,140 @@ st.session_state.model = st.sidebar.selectbox(
     index=model_options.index(st.session_state.model)
 )
 
+stream_responses = st.sidebar.toggle(lang['stream_responses_label'], value=True)
+
 uploaded_file = st.sidebar.file_uploader(lang['file_uploader_label'], type=['csv'])
 
 st.title(lang['title'])
 st.markdown(f"<p style='text-align: justify;'>{lang['description']}</p>", unsafe_allow_html=True)
 
 # --- Main App Logic ---
-if api_key:
-    genai.configure(api_key=api_key)
-
 if 'history' not in st.session_state:
     st.session_state.history = []
+if 'charts' not in st.session_state:
+    # PNG charts of each assistant message, by history index, redisplayed on reruns without re-rendering.
+    st.session_state.charts = {}
+
+@st.cache_resource
+def get_dataset_cache():
+    """Returns the process-wide on-disk dataset cache."""
+    import dataset_cache
+    return dataset_cache.DatasetCache()
+
+@st.cache_resource
+def get_dataset_store():
+    """Returns the process-wide store of loaded datasets, shared by every session."""
+    return dataset_store.DatasetStore()
+
+@st.cache_resource
+def get_backend(model_name, api_key):
+    """Returns the LLM backend for a model name and API key."""
+    import llm
+    if config.LLM_BACKEND == 'offline':
+        return llm.ScriptedBackend()
+    return llm.GeminiBackend(model_name, api_key)
+
+def load_dataset(uploaded_file, key):
+    """Loads a dataset and its column quantile sketches from the cache, parsing and caching the CSV on a miss."""
+    import ingestion
+    import quantile_sketch
+
+    cache = get_dataset_cache()
+    with tracing.span('dataset.cache_get') as record:
+        df = cache.get(key)
+        sketches = cache.get_sketches(key) if df is not None else None
+        record['hit'] = df is not None
+    if df is None:
+        progress_bar = st.sidebar.progress(0.0, text=lang['loading_file'])
+        sketches = quantile_sketch.ColumnSketches()
+        with tracing.span('csv.read', bytes=uploaded_file.size) as record:
+            df = ingestion.read_csv(
+                uploaded_file,
+                progress=lambda fraction: progress_bar.progress(fraction, text=lang['loading_file']),
+                sketches=sketches,
+            )
+            record['rows'] = len(df)
+            record['memory_bytes'] = int(df.memory_usage(deep=True).sum())
+        progress_bar.empty()
+        with tracing.span('dataset.cache_put'):
+            cache.put(key, df, sketches)
+            # Serve the memory-mapped copy: its columns are read-only, zero-copy Arrow buffers.
+            df = cache.get(key)
+    return df, sketches
+
+def open_dataset(uploaded_file, key):
+    """Loads a dataset with its profile (and sample, when large) for the shared store; returns it and its size."""
+    import dataset_profile
+    import sampling
+    import tools
+
+    df, sketches = load_dataset(uploaded_file, key)
+    large = len(df) > config.SAMPLE_MIN_ROWS
+    # Quartiles of large datasets come from the sketches built at ingestion instead of sorting every column.
+    dataset = tools.Dataset(df, key, dataset_profile.DatasetProfile(df, sketches if large else None))
+    with tracing.span('dataset.schema_card'):
+        # Computed once here and sent in the system instruction of every chat on this dataset.
+        dataset.profile.schema_card()
+    if large:
+        with tracing.span('dataset.sample', rows=len(df)):
+            dataset.sample = sampling.reservoir_sample(df, config.SAMPLE_ROWS)
+        dataset.sample_profile = dataset_profile.DatasetProfile(dataset.sample.df)
+    return dataset, int(df.memory_usage(deep=True).sum())
+
+store = get_dataset_store()
+session_id = get_script_run_ctx().session_id
 
 if uploaded_file is not None:
-    if 'current_file' not in st.session_state or st.session_state.current_file != uploaded_file.name:
+    import dataset_cache
+
+    # Hash each upload once; reruns reuse the key stored for the same upload.
+    if st.session_state.get('uploaded_file_id') != uploaded_file.file_id:
+        st.session_state.uploaded_file_id = uploaded_file.file_id
+        st.session_state.upload_key = dataset_cache.content_hash(uploaded_file.getvalue())
+
+    if st.session_state.get('dataset_key') != st.session_state.upload_key:
+        if st.session_state.get('warmup'):
+            st.session_state.warmup.cancel()
+            st.session_state.warmup = None
+        if st.session_state.get('dataset_key'):
+            store.release(st.session_state.dataset_key, session_id)
+        if runtime.exists():
+            store.prune(runtime.get_instance().is_active_session)
+        st.session_state.dataset_key = st.session_state.upload_key
         st.session_state.current_file = uploaded_file.name
+        st.session_state.dataset_ready = False
         try:
-            st.session_state.df = pd.read_csv(uploaded_file)
+            with tracing.Trace('upload', dataset=st.session_state.dataset_key) as trace:
+                key = st.session_state.dataset_key
+                dataset = store.acquire(key, session_id, lambda: open_dataset(uploaded_file, key))
+            # Precompute what the first questions usually need on the profile the tools answer from.
+            st.session_state.warmup = warmup.start(dataset.view().profile)
+            st.session_state.dataset_ready = True
+            st.session_state.last_trace = trace.to_dict()
             st.session_state.history = []
+            st.session_state.charts = {}
             st.success(lang['file_upload_success'])
         except Exception as e:
             st.error(f"{lang['error_reading_file']}: {e}")
-            if 'df' in st.session_state: del st.session_state.df
 
-    if 'df' in st.session_state:
-        df = st.session_state.df
+    if st.session_state.get('dataset_ready'):
+        key = st.session_state.dataset_key
+        # Datasets held by a session are never evicted, so this only reloads after a server restart.
+        dataset = store.acquire(key, session_id, lambda: open_dataset(uploaded_file, key))
+        df = dataset.df
+        if dataset.sample is not None:
+            st.sidebar.caption(lang['sample_info'].format(rows=len(dataset.sample.df), total=len(df)))
 
-        for role, content in st.session_state.history:
+        for i, (role, content) in enumerate(st.session_state.history):
             with st.chat_message(role):
+                for chart in st.session_state.charts.get(i, []):
+                    st.image(chart)
                 st.markdown(content)
 
         if prompt := st.chat_input(lang['chat_input_placeholder']):
+            import agent
+            import llm_client
+
             st.session_state.history.append(("user", prompt))
             with st.chat_message("user"):
                 st.markdown(prompt)
@@ -84,91 +189,75 @@ if uploaded_file is not None:
             with st.chat_message("assistant"):
                 with st.spinner(lang['thinking']):
                     try:
-                        # --- Final, Comprehensive EDA Tool Definitions ---
-                        def get_data_summary():
-                            """Provides a statistical summary of the numerical columns."""
-                            return df.describe().to_string()
-
-                        def plot_histogram(column_name: str):
-                            """Generates a histogram for a given column."""
-                            import matplotlib.pyplot as plt
-                            if column_name not in df.columns: return f"Error: Column '{column_name}' not found."
-                            fig, ax = plt.subplots()
-                            df[column_name].hist(ax=ax)
-                            ax.set_title(f'Histogram of {column_name}')
-                            st.pyplot(fig)
-                            return f"Histogram for {column_name} displayed."
-
-                        def plot_correlation_matrix():
-                            """Calculates and visualizes the correlation matrix."""
-                            import matplotlib.pyplot as plt
-                            import seaborn as sns
-                            numerical_df = df.select_dtypes(include=np.number)
-                            if numerical_df.shape[1] < 2: return "Not enough numerical columns for a correlation matrix."
-                            corr = numerical_df.corr()
-                            fig, ax = plt.subplots()
-                            sns.heatmap(corr, ax=ax, annot=True, cmap='coolwarm')
-                            st.pyplot(fig)
-                            return "Correlation matrix displayed."
-
-                        def detect_outliers(column_name: str):
-                            """Detects outliers in a numerical column using the IQR method."""
-                            if column_name not in df.columns or df[column_name].dtype not in ['int64', 'float64']:
-                                return f"Error: Column '{column_name}' is not a valid numerical column."
-                            Q1 = df[column_name].quantile(0.25)
-                            Q3 = df[column_name].quantile(0.75)
-                            IQR = Q3 - Q1
-                            outliers = df[(df[column_name] < (Q1 - 1.5 * IQR)) | (df[column_name] > (Q3 + 1.5 * IQR))]
-                            if outliers.empty:
-                                return f"No outliers detected in '{column_name}'."
-                            return f"Outliers detected in '{column_name}':\n{outliers.to_string()}"
-
-                        tool_functions = {
-                            'get_data_summary': get_data_summary,
-                            'plot_histogram': plot_histogram,
-                            'plot_correlation_matrix': plot_correlation_matrix,
-                            'detect_outliers': detect_outliers,
-                        }
-
-                        # --- Final, Correct Tool Declaration for the API ---
-                        tools_declaration = Tool(
-                            function_declarations=[
-                                FunctionDeclaration(name='get_data_summary', description=get_data_summary.__doc__),
-                                FunctionDeclaration(name='plot_histogram', description=plot_histogram.__doc__, parameters={'type': 'object', 'properties': {'column_name': {'type': 'string'}}}),
-                                FunctionDeclaration(name='plot_correlation_matrix', description=plot_correlation_matrix.__doc__),
-                                FunctionDeclaration(name='detect_outliers', description=detect_outliers.__doc__, parameters={'type': 'object', 'properties': {'column_name': {'type': 'string'}}}),
-                            ]
-                        )
-
-                        model = genai.GenerativeModel(model_name=st.session_state.model, tools=[tools_declaration])
-
-                        api_history = [{'role': 'user' if role == 'user' else 'model', 'parts': [content]} for role, content in st.session_state.history[:-1]]
-
-                        chat = model.start_chat(history=api_history)
-
-                        full_prompt = f"{lang['agent_prompt']}\nUser query: \"{prompt}\"\n\nData Columns: {list(df.columns)}"
-                        response = chat.send_message(full_prompt)
-
-                        while response.candidates[0].content.parts[0].function_call:
-                            function_call = response.candidates[0].content.parts[0].function_call
-                            function_name = function_call.name
-                            if function_name not in tool_functions:
-                                st.error(f"Function '{function_name}' not found.")
-                                break
-                            function_to_call = tool_functions[function_name]
-                            args_dict = dict(function_call.args)
-                            function_response = function_to_call(**args_dict)
-                            response = chat.send_message(
-                                [genai.protos.Part(function_response={'name': function_name, 'response': {'result': function_response}})]
-                            )
+                        backend = get_backend(st.session_state.model, api_key)
+
+                        api_history = history.build_api_history(st.session_state.history[:-1])
 
-                        final_response = response.text
-                        st.markdown(final_response)
+                        # The instructions and the dataset's schema card go in the system instruction, not in every message.
+                        system_instruction = f"{lang['agent_prompt']}\n\nDataset schema:\n{dataset.profile.schema_card()}"
+                        chat = backend.start_chat(api_history, system_instruction=system_instruction)
+                        # Streamed text goes into a placeholder; a chart closes it so later text renders below the chart.
+                        answer = {'placeholder': None, 'text': ''}
+                        turn_charts = []
+
+                        def show_result(name, result):
+                            if result.chart is not None:
+                                if answer['placeholder'] is not None:
+                                    answer['placeholder'].markdown(answer['text'])
+                                answer.update(placeholder=None, text='')
+                                st.image(result.chart)
+                                turn_charts.append(result.chart)
+
+                        def show_text(text):
+                            if answer['placeholder'] is None:
+                                answer['placeholder'] = st.empty()
+                            answer['text'] += text
+                            answer['placeholder'].markdown(answer['text'] + '▌')
+
+                        with tracing.Trace('turn', model=st.session_state.model, dataset=dataset.key) as trace:
+                            final_response = agent.run_turn(
+                                chat, prompt, dataset, on_result=show_result,
+                                stream=stream_responses, on_text=show_text,
+                            )
+                        st.session_state.last_trace = trace.to_dict()
+                        (answer['placeholder'] or st).markdown(final_response)
+                        if turn_charts:
+                            st.session_state.charts[len(st.session_state.history)] = turn_charts
                         st.session_state.history.append(("assistant", final_response))
 
+                    except llm_client.LLMUnavailable as e:
+                        error_message = f"{lang['llm_unavailable']}: {e}"
+                        st.warning(error_message)
+                        st.session_state.history.append(("assistant", error_message))
                     except Exception as e:
                         error_message = f"{lang['error_executing_code']}: {e}"
                         st.error(error_message)
                         st.session_state.history.append(("assistant", error_message))
 else:
-    st.info(lang['upload_file_to_start'])
\ No newline at end of file
+    st.info(lang['upload_file_to_start'])
+
+# --- Performance Panel ---
+if st.sidebar.toggle(lang['show_timings_label']):
+    with st.sidebar.expander(lang['timings_title'], expanded=True):
+        trace = st.session_state.get('last_trace')
+        if trace:
+            st.caption(f"{trace['kind']}: {trace['duration_ms']:.0f} ms")
+            st.dataframe(
+                [{
+                    'span': record['name'],
+                    'start ms': round(record['start_ms'], 1),
+                    'ms': round(record['duration_ms'], 1),
+                    'details': ', '.join(f'{k}={v}' for k, v in record.items() if k not in ('name', 'start_ms', 'duration_ms')),
+                } for record in trace['spans']],
+                hide_index=True,
+            )
+        import agent
+        cache_stats = agent.tool_cache.stats()
+        st.caption(f"{lang['tool_cache_label']}: {cache_stats['hits']} hits / {cache_stats['misses']} misses, {cache_stats['entries']} entries")
+        if st.session_state.get('warmup'):
+            st.caption(lang['warmup_status'].format(**st.session_state.warmup.status()))
+        usage = store.usage()
+        st.caption(lang['store_usage'].format(
+            datasets=usage['datasets'], used=usage['bytes'] / 2 ** 20, limit=usage['max_bytes'] / 2 ** 20,
+            sessions=usage['sessions'],
+        ))
\ No newline at end of file
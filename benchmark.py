@@ -0,0 +1,134 @@
+"""Headless benchmark of the agent loop on synthetic datasets, using the offline LLM backend.
+
+Drives the same code path as the app (ingestion, profile, history, agent loop and
+tools) without Streamlit or network access, and reports per-turn latency, time
+spent in tools and the number of model round-trips.
+
+    python benchmark.py --rows 10000 100000 300000 --turns 4 --latency 0.2
+"""
+import argparse
+import io
+import json
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+import agent
+import charts
+import dataset_cache
+import dataset_profile
+import history
+import ingestion
+import llm
+from tools import Dataset
+
+SCRIPT = [
+    [
+        [('get_data_summary', {}), ('detect_outliers', {}), ('plot_correlation_matrix', {})],
+        'Summary, outliers and correlations computed.',
+    ],
+    [
+        [('plot_histogram', {'column_name': 'Amount'})],
+        [('detect_outliers', {'column_name': 'Amount'})],
+        'Amount is right-skewed with many high outliers.',
+    ],
+    [
+        # Numbers reach the tools as floats, as they do from Gemini.
+        [('rank_features', {'target_column': 'Class', 'top_n': 5})],
+        'V14, V17 and V12 separate fraud best.',
+    ],
+]
+
+
+def synthetic_dataset(rows, features=28, fraud_rate=0.0017, seed=0):
+    """A DataFrame shaped like the Kaggle credit card fraud data: Time, V1..Vn, Amount and Class."""
+    rng = np.random.default_rng(seed)
+    data = {'Time': np.sort(rng.uniform(0, 172800, rows)).round()}
+    for i in range(1, features + 1):
+        data[f'V{i}'] = rng.standard_t(4, rows)
+    data['Amount'] = rng.lognormal(3, 1.5, rows).round(2)
+    data['Class'] = (rng.random(rows) < fraud_rate).astype(int)
+    return pd.DataFrame(data)
+
+
+class TimedChat:
+    """Wraps a chat session to count round-trips and the time spent waiting for the model."""
+
+    def __init__(self, chat):
+        self.chat = chat
+        self.round_trips = 0
+        self.seconds = 0.0
+
+    def send_message(self, content, **kwargs):
+        start = time.perf_counter()
+        response = self.chat.send_message(content, **kwargs)
+        self.seconds += time.perf_counter() - start
+        self.round_trips += 1
+        return response
+
+
+def run(rows, turns, latency, stream=False, cold=False):
+    """Benchmarks one dataset size and returns the load time and per-turn measurements."""
+    data = synthetic_dataset(rows).to_csv(index=False).encode()
+    start = time.perf_counter()
+    df = ingestion.read_csv(io.BytesIO(data))
+    load_seconds = time.perf_counter() - start
+    dataset = Dataset(df, dataset_cache.content_hash(data), dataset_profile.DatasetProfile(df))
+
+    backend = llm.ScriptedBackend(SCRIPT, latency=latency)
+    conversation, results = [], []
+    for turn in range(turns):
+        if cold:
+            agent.tool_cache.clear()
+            charts.chart_cache.clear()
+            dataset.profile = dataset_profile.DatasetProfile(df)
+        prompt = f'Benchmark question {turn + 1}'
+        chat = TimedChat(backend.start_chat(history.build_api_history(conversation)))
+        start = time.perf_counter()
+        errors = []
+        answer = agent.run_turn(
+            chat, prompt, dataset, stream=stream, on_text=lambda text: None,
+            on_result=lambda name, result: errors.extend([name] if str(result.content).startswith('Error') else []),
+        )
+        total = time.perf_counter() - start
+        conversation += [('user', prompt), ('assistant', answer)]
+        results.append({
+            'turn': turn + 1,
+            'total_ms': total * 1000,
+            'llm_ms': chat.seconds * 1000,
+            'tool_ms': (total - chat.seconds) * 1000,
+            'round_trips': chat.round_trips,
+            'tool_errors': errors,
+        })
+    return {'rows': rows, 'csv_mb': len(data) / 2 ** 20, 'load_ms': load_seconds * 1000, 'turns': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--turns', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.0, help='simulated seconds per model call')
+    parser.add_argument('--stream', action='store_true', help='use streamed model responses')
+    parser.add_argument('--cold', action='store_true', help='clear tool, chart and profile caches before every turn')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    reports = []
+    for rows in args.rows:
+        report = run(rows, args.turns, args.latency, stream=args.stream, cold=args.cold)
+        reports.append(report)
+        print(f"\n{rows:,} rows ({report['csv_mb']:.1f} MB CSV), load {report['load_ms']:.0f} ms")
+        print(f"{'turn':>4} {'total ms':>10} {'llm ms':>10} {'tool ms':>10} {'round trips':>12}  tool errors")
+        for t in report['turns']:
+            print(f"{t['turn']:>4} {t['total_ms']:>10.1f} {t['llm_ms']:>10.1f} {t['tool_ms']:>10.1f} {t['round_trips']:>12}  {', '.join(t['tool_errors']) or '-'}")
+        print(f"median turn {statistics.median(t['total_ms'] for t in report['turns']):.1f} ms")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""Chart rendering: draws from precomputed statistics and caches the PNG bytes per dataset and chart spec."""
+import io
+
+import matplotlib
+
+matplotlib.use('Agg')
+
+import numpy as np
+from matplotlib.colors import LogNorm
+from matplotlib.figure import Figure
+from matplotlib.patches import Patch
+
+import config
+import tracing
+from result_cache import ResultCache
+
+# Cell values are written on the heatmap only up to this many columns; beyond it they are unreadable and slow.
+ANNOTATE_MAX_COLUMNS = 12
+DPI = 100
+DENSITY_COLORMAPS = ('Blues', 'Greens', 'Purples', 'Greys', 'Oranges')
+POINT_COLORS = ('tab:red', 'tab:orange', 'tab:purple', 'tab:brown', 'tab:pink')
+
+chart_cache = ResultCache(config.CHART_CACHE_MB)
+
+
+def _to_png(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=DPI, bbox_inches='tight')
+    return buffer.getvalue()
+
+
+def render(dataset_key, spec, draw):
+    """Returns the PNG of chart `spec` for a dataset, calling `draw()` for a Figure only on a cache miss.
+
+    Figures are built with the object-oriented API, never registered with pyplot,
+    so they are freed once rendered and can be drawn from any thread.
+    """
+    key = (dataset_key, spec)
+    with tracing.span('chart.render', spec=spec) as record:
+        png = chart_cache.get(key)
+        record['cached'] = png is not None
+        if png is None:
+            png = _to_png(draw())
+            chart_cache.put(key, png, len(png))
+        record['png_bytes'] = len(png)
+    return png
+
+
+def histogram(counts, edges, title):
+    """Figure of a histogram from precomputed bin counts and edges."""
+    fig = Figure()
+    ax = fig.subplots()
+    ax.stairs(counts, edges, fill=True)
+    ax.grid(True)
+    ax.set_title(title)
+    return fig
+
+
+def correlation_heatmap(corr, title='Correlation matrix'):
+    """Figure of a correlation matrix heatmap."""
+    n = len(corr.columns)
+    size = max(6.4, 0.35 * n)
+    fig = Figure(figsize=(size, size * 0.8))
+    ax = fig.subplots()
+    image = ax.imshow(corr.to_numpy(), cmap='coolwarm', vmin=-1, vmax=1)
+    fig.colorbar(image, ax=ax)
+    ax.set_xticks(np.arange(n), labels=corr.columns, rotation=90)
+    ax.set_yticks(np.arange(n), labels=corr.index)
+    if n <= ANNOTATE_MAX_COLUMNS:
+        for (i, j), value in np.ndenumerate(corr.to_numpy()):
+            ax.text(j, i, f'{value:.2f}', ha='center', va='center', fontsize=8)
+    ax.set_title(title)
+    return fig
+
+
+def _draw_density(ax, density, x, y, hue=None):
+    """Draws density layers as log-scaled bin meshes and the small classes as points."""
+    handles = []
+    for i, (label, counts) in enumerate(density['layers'].items()):
+        colormap = DENSITY_COLORMAPS[i % len(DENSITY_COLORMAPS)]
+        masked = np.ma.masked_equal(counts.T, 0)
+        if masked.count():
+            ax.pcolormesh(density['x_edges'], density['y_edges'], masked, cmap=colormap,
+                          norm=LogNorm(vmin=1, vmax=masked.max()), alpha=0.85 if i else 1.0)
+        handles.append(Patch(color=matplotlib.colormaps[colormap](0.7), label=f'{hue} = {label} (density)'))
+    for i, (label, (xs, ys)) in enumerate(density['points'].items()):
+        handles.append(ax.scatter(xs, ys, s=6, color=POINT_COLORS[i % len(POINT_COLORS)],
+                                  label=f'{hue} = {label}' if hue else None))
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+    if hue and handles:
+        ax.legend(handles=handles, fontsize=8)
+
+
+def density_scatter(density, x, y, hue=None, title=None):
+    """Figure of a scatter plot drawn from `DatasetProfile.density`, whose cost does not grow with the row count."""
+    fig = Figure()
+    ax = fig.subplots()
+    _draw_density(ax, density, x, y, hue)
+    ax.set_title(title or f'{y} vs {x}')
+    return fig
+
+
+def density_grid(panels, hue=None, columns=2):
+    """Figure of several density scatter plots; `panels` is a list of (density, x, y)."""
+    rows = max(1, -(-len(panels) // columns))
+    fig = Figure(figsize=(6 * columns, 5 * rows))
+    axes = fig.subplots(rows, columns, squeeze=False).flatten()
+    for ax, (density, x, y) in zip(axes, panels):
+        _draw_density(ax, density, x, y, hue)
+        ax.set_title(f'{y} vs {x}')
+    for ax in axes[len(panels):]:
+        fig.delaxes(ax)
+    fig.tight_layout()
+    return fig
+
+
+def bar_chart(labels, values, title, xlabel=None, ylabel=None):
+    """Figure of a bar chart of precomputed values."""
+    fig = Figure(figsize=(6, 4))
+    ax = fig.subplots()
+    ax.bar([str(label) for label in labels], values)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel or '')
+    ax.set_ylabel(ylabel or '')
+    return fig
+
+
+def box_plots(panels, title=None, columns=3):
+    """Figure with one box plot panel per entry of `panels`, a list of (title, stats).
+
+    `stats` are precomputed box statistics in the format of `Axes.bxp` (one dict per
+    box with `label`, `q1`, `med`, `q3`, `whislo`, `whishi`), so no data is passed.
+    """
+    rows = max(1, -(-len(panels) // columns))
+    fig = Figure(figsize=(5 * columns, 4 * rows))
+    axes = fig.subplots(rows, columns, squeeze=False).flatten()
+    for ax, (panel_title, stats) in zip(axes, panels):
+        ax.bxp(stats, showfliers=False)
+        ax.set_title(panel_title)
+    for ax in axes[len(panels):]:
+        fig.delaxes(ax)
+    if title:
+        fig.suptitle(title)
+    fig.tight_layout()
+    return fig
+
+
+def save_png(fig, path):
+    """Writes a Figure to a PNG file."""
+    with open(path, 'wb') as f:
+        f.write(_to_png(fig))
@@ -0,0 +1,87 @@
+"""Runtime settings for the CSV Analysis Agent, overridable through environment variables."""
+import os
+
+
+def _env_int(name, default):
+    """Reads an integer setting from the environment."""
+    return int(os.environ.get(name, default))
+
+
+# --- Ingestion ---
+# Maximum in-memory size (MB) of an uploaded dataset after dtype optimization. 0 disables the check.
+MEMORY_BUDGET_MB = _env_int('EDA_MEMORY_BUDGET_MB', 1024)
+# Size (MB) of each block read from the CSV file.
+CSV_BLOCK_SIZE_MB = _env_int('EDA_CSV_BLOCK_SIZE_MB', 16)
+# Text columns with at most this share of distinct values are stored as categoricals.
+CATEGORY_MAX_RATIO = float(os.environ.get('EDA_CATEGORY_MAX_RATIO', 0.5))
+
+# --- Dataset cache ---
+# Directory holding the columnar copies of uploaded datasets, keyed by content hash.
+CACHE_DIR = os.environ.get('EDA_CACHE_DIR', os.path.join('.cache', 'datasets'))
+# Maximum total size (MB) of the dataset cache; least recently used files are evicted first.
+CACHE_MAX_MB = _env_int('EDA_CACHE_MAX_MB', 4096)
+
+# --- Shared dataset store ---
+# Memory (MB) for loaded datasets shared across sessions; idle datasets are dropped beyond it.
+STORE_MAX_MB = _env_int('EDA_STORE_MAX_MB', 2048)
+
+# --- Agent ---
+# Worker threads used to run the function calls of a single model turn concurrently.
+TOOL_WORKERS = _env_int('EDA_TOOL_WORKERS', 4)
+# Memory (MB) for memoized tool results, shared by every session of the process.
+TOOL_CACHE_MB = _env_int('EDA_TOOL_CACHE_MB', 256)
+# Memory (MB) for rendered chart PNGs, shared by every session of the process.
+CHART_CACHE_MB = _env_int('EDA_CHART_CACHE_MB', 128)
+# Background threads precomputing summaries, correlations and histograms after an upload; 0 disables it.
+WARMUP_WORKERS = _env_int('EDA_WARMUP_WORKERS', 1)
+# Processes scoring columns in parallel when ranking features; -1 uses every core.
+RANKING_WORKERS = _env_int('EDA_RANKING_WORKERS', -1)
+
+# --- Tool results ---
+# Approximate token budget of each tool result sent to the model; longer lists and tables are cut.
+RESULT_TOKEN_BUDGET = _env_int('EDA_RESULT_TOKEN_BUDGET', 1500)
+# Significant digits kept for numbers in tool results.
+RESULT_DIGITS = _env_int('EDA_RESULT_DIGITS', 6)
+
+# --- SQL queries ---
+# Result rows of a query returned to the model; longer results are truncated.
+QUERY_MAX_ROWS = _env_int('EDA_QUERY_MAX_ROWS', 100)
+# Seconds a query may run before it is cancelled.
+QUERY_TIMEOUT_SECONDS = _env_int('EDA_QUERY_TIMEOUT_SECONDS', 30)
+# Threads and memory (MB) of the DuckDB engine of each dataset.
+QUERY_THREADS = _env_int('EDA_QUERY_THREADS', os.cpu_count() or 1)
+QUERY_MEMORY_MB = _env_int('EDA_QUERY_MEMORY_MB', 1024)
+
+# --- LLM requests ---
+# Threads sending model requests, shared by every session of the process.
+LLM_WORKERS = _env_int('EDA_LLM_WORKERS', 8)
+# Requests per minute allowed per API key; bursts of a sixth of it are let through at once.
+LLM_REQUESTS_PER_MINUTE = _env_int('EDA_LLM_REQUESTS_PER_MINUTE', 60)
+# Seconds a single model request may take, including the wait for a worker, before it is abandoned.
+LLM_TIMEOUT_SECONDS = _env_int('EDA_LLM_TIMEOUT_SECONDS', 60)
+# Retries of rate-limited (429) and transient server errors, with jittered exponential backoff.
+LLM_MAX_RETRIES = _env_int('EDA_LLM_MAX_RETRIES', 4)
+LLM_BACKOFF_SECONDS = float(os.environ.get('EDA_LLM_BACKOFF_SECONDS', 1.0))
+LLM_BACKOFF_MAX_SECONDS = float(os.environ.get('EDA_LLM_BACKOFF_MAX_SECONDS', 30.0))
+
+# --- Conversation history ---
+# Approximate token budget for the chat history sent with each message.
+HISTORY_TOKEN_BUDGET = _env_int('EDA_HISTORY_TOKEN_BUDGET', 4000)
+# Most recent messages always sent verbatim, even over the budget.
+HISTORY_KEEP_MESSAGES = _env_int('EDA_HISTORY_KEEP_MESSAGES', 4)
+# Approximate token budget for the summary replacing older messages.
+HISTORY_SUMMARY_TOKENS = _env_int('EDA_HISTORY_SUMMARY_TOKENS', 500)
+
+# --- LLM backend ---
+# 'gemini' calls the Gemini API; 'offline' replays a scripted conversation without network access.
+LLM_BACKEND = os.environ.get('EDA_LLM_BACKEND', 'gemini')
+
+# --- Tracing ---
+# JSONL file receiving one line per traced chat turn or upload; empty disables the export.
+TRACE_FILE = os.environ.get('EDA_TRACE_FILE', os.path.join('.cache', 'traces.jsonl'))
+
+# --- Sampling ---
+# Rows kept when large datasets are analyzed on a sample.
+SAMPLE_ROWS = _env_int('EDA_SAMPLE_ROWS', 50000)
+# Datasets with more rows than this are answered from a sample unless the model asks for exact results.
+SAMPLE_MIN_ROWS = _env_int('EDA_SAMPLE_MIN_ROWS', 200000)
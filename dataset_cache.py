@@ -0,0 +1,113 @@
+"""Content-addressed, size-bounded cache of parsed datasets stored as Feather (Arrow IPC) files.
+
+Each dataset may have a sidecar `.sketches.npz` file with its column quantile sketches,
+evicted together with it.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+
+import pyarrow.feather as feather
+
+import config
+from quantile_sketch import ColumnSketches
+
+MB = 1024 * 1024
+# Version of the parsed form of a dataset, part of every key: bumping it keeps files
+# parsed by older code from being read back (they age out of the cache).
+PARSE_VERSION = b'2'
+
+
+def content_hash(data):
+    """Returns the hex digest identifying a dataset by its raw bytes and `PARSE_VERSION`."""
+    return hashlib.sha256(PARSE_VERSION + data).hexdigest()
+
+
+def file_hash(path, block_size=MB):
+    """Returns `content_hash` of a file's contents, reading it in blocks."""
+    digest = hashlib.sha256(PARSE_VERSION)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DatasetCache:
+    """Stores DataFrames on disk by content hash and evicts the least recently used files."""
+
+    def __init__(self, directory=config.CACHE_DIR, max_mb=config.CACHE_MAX_MB):
+        self.directory = directory
+        self.max_bytes = max_mb * MB
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, f'{key}.feather')
+
+    def sketches_path(self, key):
+        return os.path.join(self.directory, f'{key}.sketches.npz')
+
+    def __contains__(self, key):
+        return os.path.exists(self.path(key))
+
+    def get(self, key):
+        """Returns the cached DataFrame for `key`, or None on a miss."""
+        path = self.path(key)
+        try:
+            # Uncompressed Feather files are memory-mapped, so numeric columns are not copied on load.
+            table = feather.read_table(path, memory_map=True)
+        except FileNotFoundError:
+            return None
+        os.utime(path)  # mark as recently used
+        return table.to_pandas(split_blocks=True)
+
+    def get_sketches(self, key):
+        """Returns the cached column sketches for `key`, or None on a miss."""
+        try:
+            return ColumnSketches.load(self.sketches_path(key))
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, df, sketches=None):
+        """Writes `df` (and its column sketches) under `key` and trims the cache back under its size limit."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(fd)
+        try:
+            feather.write_feather(df.reset_index(drop=True), tmp_path, compression='uncompressed')
+            os.replace(tmp_path, self.path(key))
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        if sketches is not None:
+            sketches.save(self.sketches_path(key))
+        self.evict(keep=key)
+
+    def evict(self, keep=None):
+        """Removes least recently used entries until the cache fits in `max_bytes`."""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if not name.endswith('.feather'):
+                    continue
+                key = name[:-len('.feather')]
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size + self._sidecar_size(key), key))
+            total = sum(size for _, size, _ in entries)
+            for _, size, key in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if key == keep:
+                    continue
+                for path in (self.path(key), self.sketches_path(key)):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                total -= size
+
+    def _sidecar_size(self, key):
+        try:
+            return os.path.getsize(self.sketches_path(key))
+        except FileNotFoundError:
+            return 0
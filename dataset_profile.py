@@ -0,0 +1,218 @@
+"""Lazily computed, memoized statistics of a dataset, shared by all EDA tools."""
+import threading
+
+import numpy as np
+import pandas as pd
+
+import streaming_stats
+from outliers import IQR_FACTOR, scan_outliers
+
+HISTOGRAM_BINS = 10
+QUARTILES = (0.25, 0.5, 0.75)
+DENSITY_BINS = 120
+# Classes with at most this many rows are kept as individual points in density plots.
+DENSITY_POINT_ROWS = 2000
+DENSITY_MAX_CLASSES = 10
+# Most frequent values listed per text column in the schema card.
+SCHEMA_TOP_VALUES = 3
+NUMERIC_FIELDS = ('mean', 'std', 'min', 'q1', 'median', 'q3', 'max', 'skew', 'kurtosis',
+                  'iqr', 'lower_bound', 'upper_bound')
+
+
+class DatasetProfile:
+    """Computes each statistic on first use and keeps it for every later tool call.
+
+    Statistics are computed per column (or per matrix) only when requested, so the
+    profile grows incrementally. Access is thread-safe: concurrent requests for the
+    same statistic wait for a single computation.
+
+    With `sketches` (a `quantile_sketch.ColumnSketches` built during ingestion),
+    quartiles come from the sketches instead of sorting the columns.
+    """
+
+    def __init__(self, df, sketches=None):
+        self.df = df
+        self.sketches = sketches
+        self._results = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _memo(self, key, compute):
+        """Returns the stored value for `key`, computing it once if needed."""
+        with self._lock:
+            if key in self._results:
+                return self._results[key]
+            key_lock = self._locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in self._results:
+                value = compute()
+                with self._lock:
+                    self._results[key] = value
+        return self._results[key]
+
+    @property
+    def numeric_columns(self):
+        """Names of the numerical (non-boolean) columns."""
+        return self._memo('numeric_columns', lambda: list(self.df.select_dtypes(include=np.number).columns))
+
+    def is_numeric(self, column_name):
+        return column_name in self.numeric_columns
+
+    def _values(self, column_name):
+        """Non-null values of a numerical column as a float64 array."""
+        values = self.df[column_name].to_numpy(dtype=np.float64, na_value=np.nan)
+        return values[~np.isnan(values)]
+
+    def column_stats(self, column_name):
+        """Moments, quartiles, IQR bounds, null count and cardinality of a column."""
+        return self._memo(('column_stats', column_name), lambda: self._compute_column_stats(column_name))
+
+    def _compute_column_stats(self, column_name):
+        series = self.df[column_name]
+        stats = {
+            'count': int(series.count()),
+            'nulls': int(series.isna().sum()),
+            'unique': int(series.nunique(dropna=True)),
+        }
+        if not self.is_numeric(column_name):
+            return stats
+        values = self._values(column_name)
+        if values.size == 0:
+            stats.update(dict.fromkeys(NUMERIC_FIELDS, np.nan))
+            return stats
+        q1, median, q3 = self.quartiles(column_name)
+        iqr = q3 - q1
+        mean = values.mean()
+        std = values.std(ddof=1) if values.size > 1 else np.nan
+        centered = values - mean
+        m2 = np.mean(centered ** 2)
+        stats.update({
+            'mean': mean,
+            'std': std,
+            'min': values.min(),
+            'q1': q1,
+            'median': median,
+            'q3': q3,
+            'max': values.max(),
+            'skew': np.mean(centered ** 3) / m2 ** 1.5 if m2 else 0.0,
+            'kurtosis': np.mean(centered ** 4) / m2 ** 2 - 3 if m2 else 0.0,
+            'iqr': iqr,
+            'lower_bound': q1 - IQR_FACTOR * iqr,
+            'upper_bound': q3 + IQR_FACTOR * iqr,
+        })
+        return stats
+
+    def quartiles(self, column_name):
+        """First quartile, median and third quartile of a numerical column."""
+        return self._memo(('quartiles', column_name), lambda: self._compute_quartiles(column_name))
+
+    def quartile_rank_error(self):
+        """Largest rank error of sketched quartiles (a fraction of the rows), or 0 when every quartile is exact."""
+        if self.sketches is None:
+            return 0.0
+        return max((self.sketches[column].rank_error for column in self.numeric_columns if column in self.sketches),
+                   default=0.0)
+
+    def _compute_quartiles(self, column_name):
+        if self.sketches is not None and column_name in self.sketches:
+            return tuple(float(q) for q in self.sketches.quantiles(column_name, QUARTILES))
+        values = self._values(column_name)
+        return tuple(np.quantile(values, QUARTILES)) if values.size else (np.nan,) * 3
+
+    def describe(self):
+        """Summary of the numerical columns in the layout of `DataFrame.describe()`."""
+        return self._memo('describe', self._compute_describe)
+
+    def _compute_describe(self):
+        rows = {'count': 'count', 'mean': 'mean', 'std': 'std', 'min': 'min',
+                '25%': 'q1', '50%': 'median', '75%': 'q3', 'max': 'max'}
+        summary = {}
+        for column in self.numeric_columns:
+            stats = self.column_stats(column)
+            summary[column] = [stats.get(field, np.nan) for field in rows.values()]
+        return pd.DataFrame(summary, index=list(rows))
+
+    def schema_card(self):
+        """Compact text description of every column (dtype, nulls, range or top values) for the model's instructions."""
+        return self._memo('schema_card', self._compute_schema_card)
+
+    def _compute_schema_card(self):
+        rows = len(self.df)
+        lines = [f'{rows:,} rows x {len(self.df.columns)} columns']
+        for column in self.df.columns:
+            series = self.df[column]
+            parts = [str(series.dtype)]
+            nulls = int(series.isna().sum())
+            if nulls:
+                parts.append(f'nulls {nulls:,} ({nulls / rows:.1%})')
+            distinct = None if pd.api.types.is_float_dtype(series) else series.nunique()
+            if distinct is not None:
+                parts.append(f'{distinct:,} distinct')
+            if self.is_numeric(column):
+                parts.append(f'min {series.min():.6g}, max {series.max():.6g}')
+            elif distinct == rows - nulls and distinct:
+                parts.append(f'e.g. {series.dropna().iloc[0]!r}')
+            elif distinct:
+                top = series.value_counts().head(SCHEMA_TOP_VALUES)
+                parts.append('top ' + ', '.join(f'{value!r} ({count / rows:.1%})' for value, count in top.items()))
+            lines.append(f'{column}: {", ".join(parts)}')
+        return '\n'.join(lines)
+
+    def histogram(self, column_name, bins=HISTOGRAM_BINS):
+        """Bin counts and edges of a numerical column."""
+        return self._memo(('histogram', column_name, bins), lambda: np.histogram(self._values(column_name), bins=bins))
+
+    def density(self, x, y, hue=None, bins=DENSITY_BINS):
+        """2D bin counts of two numerical columns, one layer per class of `hue`.
+
+        Returns `x_edges`, `y_edges`, `layers` ({class: counts of shape (bins, bins)}) and
+        `points` ({class: (x values, y values)}) for the classes small enough to draw
+        individually, such as fraud rows. Binning is a single vectorized bincount.
+        """
+        return self._memo(('density', x, y, hue, bins), lambda: self._compute_density(x, y, hue, bins))
+
+    def _compute_density(self, x, y, hue, bins):
+        xs = self.df[x].to_numpy(dtype=np.float64, na_value=np.nan)
+        ys = self.df[y].to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = ~(np.isnan(xs) | np.isnan(ys))
+        xs, ys = xs[valid], ys[valid]
+        codes, labels = pd.factorize(self.df[hue][valid], sort=True) if hue else (np.zeros(len(xs), dtype=int), [None])
+        edges, positions = [], []
+        for values in (xs, ys):
+            low, high = (values.min(), values.max()) if values.size else (0.0, 1.0)
+            if low == high:
+                low, high = low - 0.5, high + 0.5
+            edges.append(np.linspace(low, high, bins + 1))
+            positions.append(np.clip(((values - low) / (high - low) * bins).astype(np.int64), 0, bins - 1))
+        flat = (codes * bins + positions[0]) * bins + positions[1]
+        counts = np.bincount(flat[codes >= 0], minlength=len(labels) * bins * bins).reshape(len(labels), bins, bins)
+        layers, points = {}, {}
+        for code, label in enumerate(labels):
+            label = label.item() if isinstance(label, np.generic) else label
+            rows = counts[code].sum()
+            if rows <= DENSITY_POINT_ROWS:
+                mask = codes == code
+                points[label] = (xs[mask], ys[mask])
+            else:
+                layers[label] = counts[code]
+        return {'x_edges': edges[0], 'y_edges': edges[1], 'layers': layers, 'points': points, 'rows': int(valid.sum())}
+
+    def moments(self):
+        """Means, co-moments, minima and maxima of the numerical columns, reduced in parallel over row chunks."""
+        return self._memo('moments', lambda: streaming_stats.compute(self.df, self.numeric_columns))
+
+    def correlation(self):
+        """Pearson correlation matrix of the numerical columns."""
+        return self._memo('correlation', lambda: self.moments().correlation())
+
+    def outliers(self):
+        """IQR outlier scan of every numerical column, computed in one vectorized pass."""
+        return self._memo('outliers', self._compute_outliers)
+
+    def _compute_outliers(self):
+        sketched = [column for column in self.numeric_columns if self.sketches is not None and column in self.sketches]
+        quartiles = {column: self.quartiles(column)[::2] for column in sketched}
+        scan = scan_outliers(self.df, self.numeric_columns, quartiles=quartiles)
+        for column in sketched:
+            scan[column]['quartile_rank_error'] = round(self.sketches[column].rank_error, 4)
+        return scan
@@ -0,0 +1,97 @@
+"""Process-wide store of loaded datasets, shared by every session that opens the same content.
+
+Sessions acquire a dataset by content hash and release it when they move on; each
+dataset is loaded once however many sessions view it. Datasets no session holds
+stay loaded for reuse until the store exceeds its memory ceiling, when the least
+recently used idle ones are dropped.
+"""
+import threading
+import time
+
+import config
+
+MB = 1024 * 1024
+
+
+class _Entry:
+    def __init__(self, value, nbytes):
+        self.value = value
+        self.nbytes = nbytes
+        self.sessions = set()
+        self.last_used = time.monotonic()
+
+
+class DatasetStore:
+    """Datasets by key with the set of sessions using each and a memory ceiling for idle ones."""
+
+    def __init__(self, max_mb=config.STORE_MAX_MB):
+        self.max_bytes = max_mb * MB
+        self._entries = {}
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key, session_id, load):
+        """Returns the dataset for `key`, registering `session_id` as a user.
+
+        On a miss `load()` is called once, even when several sessions ask at the same
+        time, and must return `(value, size in bytes)`.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                key_lock = self._loading.setdefault(key, threading.Lock())
+        if entry is None:
+            with key_lock:
+                with self._lock:
+                    entry = self._entries.get(key)
+                if entry is None:
+                    value, nbytes = load()
+                    entry = _Entry(value, nbytes)
+                    with self._lock:
+                        self._entries[key] = entry
+                        self._loading.pop(key, None)
+        with self._lock:
+            entry.sessions.add(session_id)
+            entry.last_used = time.monotonic()
+        self.evict()
+        return entry.value
+
+    def release(self, key, session_id):
+        """Unregisters a session from a dataset; the dataset stays loaded until evicted."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.sessions.discard(session_id)
+                entry.last_used = time.monotonic()
+        self.evict()
+
+    def prune(self, is_alive):
+        """Releases every session for which `is_alive(session_id)` is false, e.g. closed browser tabs."""
+        with self._lock:
+            for entry in self._entries.values():
+                entry.sessions = {session for session in entry.sessions if is_alive(session)}
+        self.evict()
+
+    def evict(self):
+        """Drops least recently used datasets without sessions until the store fits under its ceiling."""
+        with self._lock:
+            total = sum(entry.nbytes for entry in self._entries.values())
+            idle = sorted((entry.last_used, key) for key, entry in self._entries.items() if not entry.sessions)
+            for _, key in idle:
+                if total <= self.max_bytes:
+                    break
+                total -= self._entries.pop(key).nbytes
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def usage(self):
+        """Current datasets, bytes held, ceiling and sessions, for display."""
+        with self._lock:
+            entries = list(self._entries.values())
+        return {
+            'datasets': len(entries),
+            'bytes': sum(entry.nbytes for entry in entries),
+            'max_bytes': self.max_bytes,
+            'sessions': len(set().union(*(entry.sessions for entry in entries))),
+        }
@@ -0,0 +1,164 @@
+"""Compact JSON encoding of tool results for the model, within a per-call token budget.
+
+Tools return plain Python values, pandas objects or text. Before a result goes to
+the model it is converted to JSON-compatible values with:
+  * numbers rounded to `config.RESULT_DIGITS` significant digits and NumPy scalars unwrapped;
+  * DataFrames as column-major tables, {'columns': {name: [values]}} plus the row labels,
+    so names are not repeated on every row;
+  * texts nested in a result capped at a share of the budget;
+  * lists, dicts and tables cut down, longest first, until the estimated tokens fit
+    the budget, each cut leaving an explicit "N more" marker. Tables lose rows down
+    to one, then columns.
+"""
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+import config
+from history import CHARS_PER_TOKEN, estimate_tokens
+
+# Share of the budget one text nested in a result may take, so a long text cell cannot fill it alone.
+TEXT_SHARE = 0.25
+
+
+def _number(value, digits):
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    value = float(value)
+    if math.isnan(value):
+        return None
+    if math.isinf(value):
+        return 'inf' if value > 0 else '-inf'
+    value = float(f'{value:.{digits}g}')
+    return int(value) if value.is_integer() and abs(value) < 2 ** 53 else value
+
+
+def _label(value):
+    return value if isinstance(value, str) else str(value)
+
+
+def compact(value, digits=config.RESULT_DIGITS):
+    """Converts a tool result to JSON-compatible values with rounded numbers and column-major tables."""
+    if isinstance(value, pd.DataFrame):
+        table = {'columns': {_label(column): compact(value[column].tolist(), digits) for column in value.columns}}
+        if not isinstance(value.index, pd.RangeIndex):
+            table['index'] = [_label(label) for label in value.index]
+        return table
+    if isinstance(value, pd.Series):
+        return {_label(label): compact(item, digits) for label, item in value.items()}
+    if isinstance(value, np.ndarray):
+        return compact(value.tolist(), digits)
+    if isinstance(value, dict):
+        return {_label(key): compact(item, digits) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [compact(item, digits) for item in value]
+    if isinstance(value, (int, float, np.number, np.bool_)):
+        return _number(value, digits)
+    if value is None or isinstance(value, str):
+        return value
+    if value is pd.NA or value is pd.NaT:
+        return None
+    return str(value)
+
+
+def size_tokens(value):
+    """Estimated tokens of a value serialized as compact JSON."""
+    return estimate_tokens(json.dumps(value, separators=(',', ':'), ensure_ascii=False))
+
+
+def _is_table(value):
+    columns = value.get('columns')
+    return isinstance(columns, dict) and bool(columns) and all(isinstance(values, list) for values in columns.values())
+
+
+def _truncate(text, limit):
+    return text if len(text) <= limit else f'{text[:limit]}… {len(text) - limit} more characters'
+
+
+def _cap_texts(value, limit):
+    """A compacted value with every nested text truncated to `limit` characters."""
+    if isinstance(value, dict):
+        return {key: _cap_texts(item, limit) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_cap_texts(item, limit) for item in value]
+    return _truncate(value, limit) if isinstance(value, str) else value
+
+
+def _table_size(table):
+    """Rows of a table, or its columns once it is down to one row, and whether those are rows."""
+    rows = len(next(iter(table['columns'].values())))
+    return (rows, True) if rows > 1 else (len(table['columns']), False)
+
+
+def _sequences(value):
+    """Every cuttable list, dict and table in a compacted value, with its number of items."""
+    if isinstance(value, dict):
+        if _is_table(value):
+            yield value, _table_size(value)[0]
+            return
+        yield value, len(value) - (1 if MARKER_KEY in value else 0)
+        for item in value.values():
+            yield from _sequences(item)
+    elif isinstance(value, list):
+        yield value, len(value) - (1 if value and _is_marker(value[-1]) else 0)
+        for item in value:
+            yield from _sequences(item)
+
+
+# Key of the entry standing in for the entries cut from a dict.
+MARKER_KEY = '…'
+
+
+def _is_marker(item):
+    return isinstance(item, str) and item.startswith('… ') and item.endswith(' more')
+
+
+def _cut(sequence, keep):
+    """Keeps the first `keep` items of a list, dict or table and records how many were left out.
+
+    A table keeps its first `keep` rows, or its first `keep` columns once it has a single row.
+    """
+    if isinstance(sequence, dict) and not _is_table(sequence):
+        left_out = int(sequence.pop(MARKER_KEY, '0 more').split()[0]) + len(sequence) - keep
+        for key in list(sequence)[keep:]:
+            del sequence[key]
+        sequence[MARKER_KEY] = f'{left_out} more'
+    elif isinstance(sequence, dict) and not _table_size(sequence)[1]:
+        columns = list(sequence['columns'])
+        for column in columns[keep:]:
+            del sequence['columns'][column]
+        sequence['more_columns'] = sequence.get('more_columns', 0) + len(columns) - keep
+    elif isinstance(sequence, dict):
+        rows = len(next(iter(sequence['columns'].values())))
+        for column, values in sequence['columns'].items():
+            sequence['columns'][column] = values[:keep]
+        if 'index' in sequence:
+            sequence['index'] = sequence['index'][:keep]
+        sequence['more_rows'] = sequence.get('more_rows', 0) + rows - keep
+    else:
+        marker = sequence.pop() if sequence and _is_marker(sequence[-1]) else '… 0 more'
+        left_out = int(marker.split()[1]) + len(sequence) - keep
+        del sequence[keep:]
+        sequence.append(f'… {left_out} more')
+
+
+def encode(value, budget_tokens=config.RESULT_TOKEN_BUDGET, digits=config.RESULT_DIGITS):
+    """Compacts a tool result and shortens its longest lists, dicts and tables until it fits `budget_tokens`.
+
+    Text results are returned unchanged except for truncation of very long texts.
+    """
+    limit = budget_tokens * CHARS_PER_TOKEN
+    if isinstance(value, str):
+        return _truncate(value, limit)
+    value = _cap_texts(compact(value, digits), int(limit * TEXT_SHARE))
+    while size_tokens(value) > budget_tokens:
+        candidates = [(length, sequence) for sequence, length in _sequences(value) if length > 1]
+        if not candidates:
+            break
+        length, sequence = max(candidates, key=lambda candidate: candidate[0])
+        _cut(sequence, length // 2)
+    return value
@@ -0,0 +1,68 @@
+"""Token-budgeted conversation history: recent messages verbatim, older ones folded into a summary."""
+import config
+
+# Rough characters-per-token ratio for Gemini tokenizers on English/Portuguese text.
+CHARS_PER_TOKEN = 4
+# Characters kept from each older message in the rolling summary.
+SUMMARY_SNIPPET_CHARS = 200
+
+
+def estimate_tokens(text):
+    """Estimates the number of tokens in a text without calling the API."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _clip(text, limit):
+    text = ' '.join(text.split())
+    return text if len(text) <= limit else text[:limit].rstrip() + '…'
+
+
+def summarize(messages, budget_tokens=config.HISTORY_SUMMARY_TOKENS):
+    """Folds older (role, content) messages into a short summary within `budget_tokens`.
+
+    Each message contributes one clipped line; when the lines do not fit, the
+    oldest are dropped and counted instead.
+    """
+    lines = [f"- {'User' if role == 'user' else 'Assistant'}: {_clip(content, SUMMARY_SNIPPET_CHARS)}"
+             for role, content in messages]
+    kept, used = [], 0
+    for line in reversed(lines):
+        used += estimate_tokens(line)
+        if used > budget_tokens:
+            break
+        kept.append(line)
+    kept.reverse()
+    omitted = len(lines) - len(kept)
+    header = "Summary of the earlier conversation"
+    if omitted:
+        header += f" ({omitted} older messages omitted)"
+    return header + ":\n" + "\n".join(kept)
+
+
+def build_api_history(history, budget_tokens=config.HISTORY_TOKEN_BUDGET, keep_recent=config.HISTORY_KEEP_MESSAGES):
+    """Converts (role, content) history into Gemini chat history that fits `budget_tokens`.
+
+    The newest messages are kept verbatim while they fit the budget (always at least
+    `keep_recent` of them); everything older is replaced by a summary attached to the
+    first kept user message.
+    """
+    start, used = len(history), 0
+    while start > 0:
+        cost = estimate_tokens(history[start - 1][1])
+        if len(history) - start >= keep_recent and used + cost > budget_tokens:
+            break
+        used += cost
+        start -= 1
+    # Gemini expects the history to open with a user message.
+    while start < len(history) and history[start][0] != 'user':
+        start += 1
+
+    api_history = [{'role': 'user' if role == 'user' else 'model', 'parts': [content]}
+                   for role, content in history[start:]]
+    if start > 0:
+        summary = summarize(history[:start])
+        if api_history:
+            api_history[0]['parts'].insert(0, summary)
+        else:
+            api_history.append({'role': 'user', 'parts': [summary]})
+    return api_history
@@ -0,0 +1,153 @@
+"""Chunked CSV ingestion with dtype optimization and a memory budget."""
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+import config
+
+MB = 1024 * 1024
+
+
+class MemoryBudgetExceeded(MemoryError):
+    """Raised when a dataset does not fit in the configured memory budget."""
+
+
+def downcast_numeric(df):
+    """Downcasts numeric columns to the smallest dtype that holds their values exactly.
+
+    Floats become float32 only when every value survives the round trip, so IDs,
+    epoch timestamps and prices keep all their digits.
+    """
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_bool_dtype(series):
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            kind = 'unsigned' if len(series) and series.min() >= 0 else 'integer'
+            df[column] = pd.to_numeric(series, downcast=kind)
+        elif pd.api.types.is_float_dtype(series) and series.dtype != np.float32:
+            values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+            with np.errstate(over='ignore'):
+                narrowed = values.astype(np.float32)
+            if np.array_equal(narrowed.astype(np.float64), values, equal_nan=True):
+                df[column] = series.astype(np.float32)
+    return df
+
+
+def categorize_text(df, max_ratio=config.CATEGORY_MAX_RATIO):
+    """Converts low-cardinality text columns to categoricals."""
+    for column in df.select_dtypes(include=['object', 'string']).columns:
+        series = df[column]
+        if len(series) and series.nunique(dropna=True) <= max_ratio * len(series):
+            df[column] = series.astype('category')
+    return df
+
+
+def optimize_dtypes(df):
+    """Applies numeric downcasting and categorical conversion to a DataFrame."""
+    return categorize_text(downcast_numeric(df))
+
+
+def _source_size(source):
+    """Returns the size in bytes of a file path or file-like object, if known."""
+    if isinstance(source, (str, bytes)) or hasattr(source, '__fspath__'):
+        return os.path.getsize(source)
+    size = getattr(source, 'size', None)
+    if size is None and hasattr(source, 'seek'):
+        position = source.tell()
+        size = source.seek(0, 2)
+        source.seek(position)
+    return size
+
+
+def _check_budget(used, memory_budget_mb):
+    if memory_budget_mb and used > memory_budget_mb * MB:
+        raise MemoryBudgetExceeded(
+            f"Dataset needs more than the {memory_budget_mb} MB memory budget "
+            f"(set EDA_MEMORY_BUDGET_MB to raise it)."
+        )
+
+
+def _iter_arrow_chunks(source, block_size):
+    """Yields (chunk, bytes read) pairs using pyarrow's streaming CSV reader."""
+    reader = pacsv.open_csv(source, read_options=pacsv.ReadOptions(block_size=block_size))
+    # The reader prefetches ahead of the batches it returns, so progress is counted in blocks.
+    for i, batch in enumerate(reader, start=1):
+        yield batch.to_pandas(), i * block_size
+
+
+def _iter_pandas_chunks(source, block_size):
+    """Yields (chunk, bytes read) pairs using the C parser; used when column types vary between blocks."""
+    for chunk in pd.read_csv(source, chunksize=max(block_size // 256, 1000)):
+        yield chunk, source.tell() if hasattr(source, 'tell') else None
+
+
+def iter_csv_chunks(source, chunk_rows=100_000, downcast=True):
+    """Yields a CSV as DataFrame chunks, for single-pass streaming algorithms.
+
+    Uses the pandas C parser, which tolerates column types changing between chunks.
+    Row labels continue across chunks, so they are the row's position in the file.
+    Numeric dtypes are downcast unless `downcast` is false, for chunks that are
+    reduced and dropped rather than kept.
+    """
+    for chunk in pd.read_csv(source, chunksize=chunk_rows):
+        yield downcast_numeric(chunk) if downcast else chunk
+
+
+def iter_chunks(source, chunk_rows=100_000, downcast=True):
+    """Yields row chunks of a DataFrame, or of a CSV (path or buffer) via `iter_csv_chunks`."""
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunk_rows):
+            yield source.iloc[start:start + chunk_rows]
+    else:
+        yield from iter_csv_chunks(source, chunk_rows, downcast)
+
+
+def _read_chunks(chunks, size, memory_budget_mb, progress, sketches):
+    frames, used = [], 0
+    for chunk, bytes_read in chunks:
+        chunk = downcast_numeric(chunk)
+        used += chunk.memory_usage(deep=True).sum()
+        _check_budget(used, memory_budget_mb)
+        frames.append(chunk)
+        if sketches is not None:
+            sketches.update(chunk)
+        if progress and size and bytes_read:
+            progress(min(bytes_read / size, 1.0))
+    return frames
+
+
+def read_csv(source, memory_budget_mb=config.MEMORY_BUDGET_MB, block_size_mb=config.CSV_BLOCK_SIZE_MB, progress=None,
+             sketches=None):
+    """Reads a CSV in chunks, shrinking dtypes as it goes and enforcing the memory budget.
+
+    `progress`, if given, is called with the fraction of the file read so far.
+    `sketches`, a `quantile_sketch.ColumnSketches`, is fed every chunk on the way.
+    """
+    size = _source_size(source)
+    block_size = block_size_mb * MB
+    start = source.tell() if hasattr(source, 'tell') else 0
+    try:
+        frames = _read_chunks(_iter_arrow_chunks(source, block_size), size, memory_budget_mb, progress, sketches)
+    except pa.ArrowInvalid:
+        # pyarrow fixes column types from the first block; re-read with pandas when they change later on.
+        if hasattr(source, 'seek'):
+            source.seek(start)
+        if sketches is not None:
+            sketches.sketches.clear()
+        frames = _read_chunks(_iter_pandas_chunks(source, block_size), size, memory_budget_mb, progress, sketches)
+
+    if not frames:
+        # Header-only file: let pandas build the empty frame with the right columns.
+        if hasattr(source, 'seek'):
+            source.seek(start)
+        return pd.read_csv(source)
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    df = optimize_dtypes(df)
+    _check_budget(df.memory_usage(deep=True).sum(), memory_budget_mb)
+    if progress:
+        progress(1.0)
+    return df
@@ -0,0 +1,98 @@
+"""LLM backends used by the agent loop: the Gemini API and a scripted offline stand-in.
+
+A backend only needs `start_chat(history, system_instruction=None)`, returning a chat
+whose `send_message(content, stream=False)` returns a Gemini `GenerateContentResponse`.
+"""
+import itertools
+import time
+
+import google.generativeai as genai
+from google.generativeai import protos
+from google.generativeai.types import GenerateContentResponse
+
+import llm_client
+from tools import registry
+
+
+class GeminiBackend:
+    """Chat sessions on a Gemini model declaring the registered tools.
+
+    Requests use the API key's shared client and rate limiter, with retries and timeouts
+    (see `llm_client`).
+    """
+
+    def __init__(self, model_name, api_key):
+        self.model_name = model_name
+        self.limits = llm_client.limits_for(api_key)
+
+    def start_chat(self, history, system_instruction=None):
+        # Models are cheap local objects; one per chat carries that chat's system instruction.
+        model = genai.GenerativeModel(model_name=self.model_name, tools=[registry.tool],
+                                      system_instruction=system_instruction)
+        # Use the key's own client instead of the global `genai.configure` one, shared by all sessions.
+        model._client = self.limits.client
+        return llm_client.ResilientChat(model.start_chat(history=history), self.limits)
+
+
+# Default script for the offline backend: one multi-tool turn, then an answer.
+DEFAULT_SCRIPT = [
+    [
+        [('get_data_summary', {}), ('detect_outliers', {}), ('plot_correlation_matrix', {})],
+        'Offline answer: the summary, outliers and correlation matrix were computed.',
+    ],
+]
+
+
+def _response(parts):
+    return protos.GenerateContentResponse(candidates=[protos.Candidate(
+        index=0, content=protos.Content(role='model', parts=parts), finish_reason=protos.Candidate.FinishReason.STOP,
+    )])
+
+
+def _step_parts(step):
+    """Turns a script step (answer text or a list of (tool name, args) calls) into response parts."""
+    if isinstance(step, str):
+        return [protos.Part(text=step)]
+    return [protos.Part(function_call=protos.FunctionCall(name=name, args=args)) for name, args in step]
+
+
+class ScriptedChat:
+    """Replays the steps of one scripted turn, one per `send_message`."""
+
+    def __init__(self, steps, history, latency, system_instruction=None):
+        self.steps = steps
+        self.history = list(history)
+        self.latency = latency
+        self.system_instruction = system_instruction
+        self._position = 0
+
+    def send_message(self, content, stream=False, **kwargs):
+        step = self.steps[min(self._position, len(self.steps) - 1)]
+        self._position += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if not stream:
+            return GenerateContentResponse.from_response(_response(_step_parts(step)))
+        if isinstance(step, str):
+            words = step.split(' ')
+            chunks = [_response([protos.Part(text=word + ' ' * (i < len(words) - 1))]) for i, word in enumerate(words)]
+        else:
+            chunks = [_response(_step_parts(step))]
+        return GenerateContentResponse.from_iterator(iter(chunks))
+
+
+class ScriptedBackend:
+    """Deterministic offline backend that needs no network or API key.
+
+    `script` is a list of turns; each turn is a list of steps answered in order:
+    a list of (tool name, args) function calls, or the final answer text. Each
+    `start_chat` plays the next turn, cycling through the script. `latency`
+    seconds are slept per call to imitate a remote model.
+    """
+
+    def __init__(self, script=DEFAULT_SCRIPT, latency=0.0):
+        self.latency = latency
+        self._turns = itertools.cycle(script)
+
+    def start_chat(self, history, system_instruction=None):
+        return ScriptedChat(next(self._turns), history, self.latency, system_instruction)
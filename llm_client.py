@@ -0,0 +1,134 @@
+"""Resilient model requests: per-key clients, a shared worker pool, rate limiting, retries and timeouts.
+
+Every chat message goes through `ResilientChat.send_message`, which
+  * waits for a token from the API key's token bucket, so a burst of sessions queues
+    instead of tripping the API's rate limit;
+  * runs the request on a bounded process-wide thread pool, so slow calls cannot tie
+    up more than `config.LLM_WORKERS` threads;
+  * gives up after `config.LLM_TIMEOUT_SECONDS`;
+  * retries 429s, 5xx errors and deadline errors with jittered exponential backoff.
+One `GenerativeServiceClient` is kept per API key, so its connection is reused.
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import google.ai.generativelanguage as glm
+from google.api_core import exceptions
+
+import config
+
+RETRYABLE_ERRORS = (
+    exceptions.TooManyRequests,
+    exceptions.ResourceExhausted,
+    exceptions.InternalServerError,
+    exceptions.BadGateway,
+    exceptions.ServiceUnavailable,
+    exceptions.GatewayTimeout,
+    exceptions.DeadlineExceeded,
+    TimeoutError,
+)
+
+_executor = ThreadPoolExecutor(max_workers=config.LLM_WORKERS, thread_name_prefix='llm')
+
+
+class LLMUnavailable(RuntimeError):
+    """Raised when a request still fails after every retry, or cannot be sent within its timeout."""
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average, with bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """Takes a token, waiting for one if needed; returns False if none is available within `timeout`."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+def backoff_delay(attempt, base=config.LLM_BACKOFF_SECONDS, maximum=config.LLM_BACKOFF_MAX_SECONDS):
+    """Seconds to wait before retry `attempt` (0-based): exponential with full jitter."""
+    return random.uniform(0, min(maximum, base * 2 ** attempt))
+
+
+class KeyLimits:
+    """Rate limiter and API client shared by every session using one API key."""
+
+    def __init__(self, api_key, requests_per_minute=config.LLM_REQUESTS_PER_MINUTE):
+        rate = requests_per_minute / 60
+        self.bucket = TokenBucket(rate, capacity=max(1, requests_per_minute // 6))
+        self.api_key = api_key
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """The Gemini API client for this key, created once so its connection is reused."""
+        with self._lock:
+            if self._client is None:
+                self._client = glm.GenerativeServiceClient(client_options={'api_key': self.api_key})
+            return self._client
+
+
+_keys = {}
+_keys_lock = threading.Lock()
+
+
+def limits_for(api_key):
+    """Returns the process-wide `KeyLimits` of an API key."""
+    with _keys_lock:
+        if api_key not in _keys:
+            _keys[api_key] = KeyLimits(api_key)
+        return _keys[api_key]
+
+
+class ResilientChat:
+    """Wraps a chat session so every `send_message` is rate limited, pooled, timed out and retried."""
+
+    def __init__(self, chat, limits, timeout=config.LLM_TIMEOUT_SECONDS, max_retries=config.LLM_MAX_RETRIES):
+        self.chat = chat
+        self.limits = limits
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retries = 0
+
+    @property
+    def history(self):
+        return self.chat.history
+
+    def send_message(self, content, stream=False, **kwargs):
+        # The client's own retries are disabled so that these limits and delays apply.
+        kwargs['request_options'] = {'timeout': self.timeout, 'retry': None}
+        for attempt in range(self.max_retries + 1):
+            if not self.limits.bucket.acquire(timeout=self.timeout):
+                raise LLMUnavailable('Rate limit: no request slot became available in time.')
+            future = _executor.submit(self.chat.send_message, content, stream=stream, **kwargs)
+            try:
+                return future.result(timeout=self.timeout)
+            except (FutureTimeout, *RETRYABLE_ERRORS) as e:
+                # A request that already started may still complete and update the chat, so it is not resent.
+                if isinstance(e, FutureTimeout) and not future.cancel():
+                    raise LLMUnavailable(f'Model request timed out after {self.timeout} s.') from e
+                if attempt == self.max_retries:
+                    raise LLMUnavailable(f'Model request failed after {attempt + 1} attempts: {e}') from e
+                self.retries += 1
+                time.sleep(backoff_delay(attempt))
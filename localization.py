@@ -0,0 +1,22 @@
+"""UI strings of every language, parsed once per process instead of on every Streamlit rerun."""
+import functools
+import json
+import os
+
+LOCALES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'locales')
+LANGUAGES = ('pt', 'en', 'es')
+
+
+@functools.lru_cache(maxsize=None)
+def catalog():
+    """The strings of every language, by language code."""
+    strings = {}
+    for language in LANGUAGES:
+        with open(os.path.join(LOCALES_DIR, f'{language}.json'), 'r', encoding='utf-8') as f:
+            strings[language] = json.load(f)
+    return strings
+
+
+def load_language(language):
+    """The strings of one language; shared by all sessions, so callers must not modify them."""
+    return catalog()[language]
@@ -0,0 +1,61 @@
+"""Vectorized IQR outlier scan over all numerical columns at once."""
+import warnings
+
+import numpy as np
+
+IQR_FACTOR = 1.5
+TOP_K = 5
+# Columns converted to a float64 block at a time, bounding the scan's extra memory.
+BLOCK_COLUMNS = 8
+
+
+def _native(value):
+    """Converts a NumPy scalar to the equivalent Python value."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def scan_outliers(df, columns, top_k=TOP_K, iqr_factor=IQR_FACTOR, quartiles=None):
+    """Computes IQR bounds, outlier counts and the most extreme values of each column.
+
+    Returns a dict per column with `outliers`, `percent`, `q1`, `q3`, `lower_bound`,
+    `upper_bound` and `most_extreme` (up to `top_k` rows furthest outside the bounds,
+    as {'row': index label, 'value': value}). `quartiles` may map columns to known
+    (q1, q3) pairs, e.g. from quantile sketches, which are then not recomputed.
+    """
+    quartiles = quartiles or {}
+    results = {}
+    index = df.index.to_numpy()
+    for start in range(0, len(columns), BLOCK_COLUMNS):
+        block = list(columns[start:start + BLOCK_COLUMNS])
+        values = df[block].to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = (~np.isnan(values)).sum(axis=0)
+        if all(column in quartiles for column in block):
+            q1, q3 = (np.array(q) for q in zip(*(quartiles[column] for column in block)))
+        elif len(values):
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN columns have NaN bounds and no outliers
+                q1, q3 = np.nanquantile(values, [0.25, 0.75], axis=0)
+        else:
+            q1 = q3 = np.full(len(block), np.nan)
+        iqr = q3 - q1
+        lower, upper = q1 - iqr_factor * iqr, q3 + iqr_factor * iqr
+        # Distance outside the bounds; non-outliers (and NaNs) get -inf so they never rank.
+        distance = np.fmax(lower - values, values - upper)
+        distance = np.where(distance > 0, distance, -np.inf)
+        counts = np.isfinite(distance).sum(axis=0)
+        k = min(top_k, len(values))
+        top = np.argpartition(-distance, k - 1, axis=0)[:k] if k else np.empty((0, len(block)), dtype=int)
+        for j, column in enumerate(block):
+            rows = top[:, j]
+            rows = rows[np.isfinite(distance[rows, j])]
+            rows = rows[np.argsort(-distance[rows, j])]
+            results[column] = {
+                'outliers': int(counts[j]),
+                'percent': round(100.0 * float(counts[j] / valid[j]), 3) if valid[j] else 0.0,
+                'q1': float(q1[j]),
+                'q3': float(q3[j]),
+                'lower_bound': float(lower[j]),
+                'upper_bound': float(upper[j]),
+                'most_extreme': [{'row': _native(index[r]), 'value': float(values[r, j])} for r in rows],
+            }
+    return results
@@ -0,0 +1,365 @@
+"""Headless batch EDA: runs the notebook's analysis and treatment steps over many CSV files in parallel.
+
+Each input gets its own directory under the output directory with the summary,
+correlations, feature ranking, charts, outlier report and the treated CSV. A manifest records a key
+per stage (a hash of the input contents, the stage and its options); a stage whose
+key is unchanged and whose outputs still exist is skipped on the next run.
+
+    python pipeline.py data/*.csv partitions/ --output-dir eda-out --workers 8
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import charts
+import config
+import dataset_cache
+import dataset_profile
+import feature_ranking
+import ingestion
+import quantile_sketch
+# Stages comparing classes only run when the target has at most MAX_CLASSES distinct values, as feature ranking requires.
+from feature_ranking import MAX_CLASSES
+from outliers import IQR_FACTOR
+
+MANIFEST = 'manifest.json'
+
+
+class Stage:
+    """A pipeline step: a function of the run returning the files it wrote, and the options it depends on."""
+
+    def __init__(self, function, options):
+        self.function = function
+        self.name = function.__name__
+        self.options = options
+
+
+STAGES = []
+
+
+def stage(*options):
+    """Decorator registering a stage function; `options` are the CLI options its outputs depend on."""
+    def register(function):
+        STAGES.append(Stage(function, options))
+        return function
+    return register
+
+
+class Run:
+    """One input file going through the pipeline: its data, loaded on first use, and its stage manifest."""
+
+    def __init__(self, path, directory, options):
+        self.path = path
+        self.directory = directory
+        self.options = options
+        self.input_hash = dataset_cache.file_hash(path)
+        self._df = None
+        self._profile = None
+        self._ranking = None
+        os.makedirs(directory, exist_ok=True)
+        try:
+            with open(os.path.join(directory, MANIFEST), encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.manifest = {}
+
+    @property
+    def df(self):
+        if self._df is None:
+            self._load()
+        return self._df
+
+    @property
+    def profile(self):
+        if self._profile is None:
+            self._load()
+        return self._profile
+
+    def _load(self):
+        sketches = quantile_sketch.ColumnSketches()
+        self._df = ingestion.read_csv(self.path, memory_budget_mb=self.options.memory_budget_mb, sketches=sketches)
+        large = len(self._df) > config.SAMPLE_MIN_ROWS
+        self._profile = dataset_profile.DatasetProfile(self._df, sketches if large else None)
+
+    def output(self, name):
+        """Absolute path of an output file, creating its directory."""
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def stage_key(self, step):
+        options = {name: getattr(self.options, name) for name in step.options}
+        payload = json.dumps([self.input_hash, step.name, options], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def is_fresh(self, step):
+        entry = self.manifest.get(step.name)
+        return (entry is not None and entry['key'] == self.stage_key(step)
+                and all(os.path.exists(os.path.join(self.directory, name)) for name in entry['outputs']))
+
+    def record(self, step, outputs):
+        self.manifest[step.name] = {'key': self.stage_key(step), 'outputs': outputs}
+        path = os.path.join(self.directory, MANIFEST)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(path + '.tmp', path)
+
+    @property
+    def has_classes(self):
+        target = self.options.target
+        return target in self.df.columns and self.df[target].nunique() <= MAX_CLASSES
+
+    def ranking(self):
+        """The target's feature ranking, from this run's rank_features stage or its up-to-date output."""
+        if self._ranking is None:
+            self._ranking = pd.read_csv(os.path.join(self.directory, 'feature_ranking.csv'), index_col='feature')
+        return self._ranking
+
+    def top_features(self, exclude=()):
+        """The `features` best columns against the target, other than it and `exclude`, best first.
+
+        Class targets use the feature ranking; other numerical targets the absolute correlation.
+        """
+        target = self.options.target
+        if self.has_classes:
+            candidates = list(self.ranking().index)
+        elif self.profile.is_numeric(target):
+            correlation = self.profile.correlation()[target].drop(target)
+            candidates = list(correlation.abs().dropna().sort_values(ascending=False).index)
+        else:
+            candidates = self.profile.numeric_columns
+        excluded = {target, *exclude}
+        return [column for column in candidates if column not in excluded][:self.options.features]
+
+
+# --- Stages ---
+@stage()
+def summary(run):
+    """describe()-style summary plus null counts and cardinality of every column."""
+    table = run.profile.describe()
+    stats = {column: run.profile.column_stats(column) for column in run.df.columns}
+    table.loc['nulls'] = [stats[column]['nulls'] for column in table.columns]
+    table.loc['unique'] = [stats[column]['unique'] for column in table.columns]
+    if run.profile.quartile_rank_error():
+        # Quartiles of large inputs come from the ingestion sketches.
+        table.loc['quartile_rank_error'] = [
+            run.profile.sketches[column].rank_error if column in run.profile.sketches else 0.0 for column in table.columns
+        ]
+    table.to_csv(run.output('summary.csv'))
+    return ['summary.csv']
+
+
+@stage()
+def correlation(run):
+    if len(run.profile.numeric_columns) < 2:
+        return None
+    matrix = run.profile.correlation()
+    matrix.to_csv(run.output('correlation.csv'))
+    charts.save_png(charts.correlation_heatmap(matrix), run.output('correlation.png'))
+    return ['correlation.csv', 'correlation.png']
+
+
+@stage('target')
+def class_distribution(run):
+    if not run.has_classes:
+        return None
+    counts = run.df[run.options.target].value_counts(dropna=False).sort_index()
+    counts.to_csv(run.output('class_distribution.csv'))
+    fig = charts.bar_chart(counts.index, counts.to_numpy(), f'Distribution of {run.options.target}',
+                           run.options.target, 'Count')
+    charts.save_png(fig, run.output('class_distribution.png'))
+    return ['class_distribution.csv', 'class_distribution.png']
+
+
+@stage('target')
+def rank_features(run):
+    """Point-biserial, mutual information and AUC scores of every numerical column against the target."""
+    if not run.has_classes:
+        return None
+    df = run.df
+    if len(df) > config.SAMPLE_MIN_ROWS:
+        df = feature_ranking.class_sample(df, run.options.target, config.SAMPLE_ROWS).df
+    run._ranking = feature_ranking.rank_features(df, run.options.target, workers=run.options.ranking_workers)
+    run._ranking.to_csv(run.output('feature_ranking.csv'))
+    return ['feature_ranking.csv']
+
+
+@stage('bins')
+def histograms(run):
+    outputs = []
+    for column in run.profile.numeric_columns:
+        name = os.path.join('histograms', f'{column}.png')
+        counts, edges = run.profile.histogram(column, run.options.bins)
+        charts.save_png(charts.histogram(counts, edges, f'Histogram of {column}'), run.output(name))
+        outputs.append(name)
+    return outputs
+
+
+def _box_stats(values, label):
+    values = values[~np.isnan(values)]
+    if not values.size:
+        return None
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    low, high = q1 - IQR_FACTOR * (q3 - q1), q3 + IQR_FACTOR * (q3 - q1)
+    return {'label': label, 'q1': q1, 'med': median, 'q3': q3,
+            'whislo': values[values >= low].min(), 'whishi': values[values <= high].max()}
+
+
+@stage('target', 'features')
+def box_plots(run):
+    """Box plots of the best ranked features against the target, one box per class."""
+    if not run.has_classes:
+        return None
+    target = run.df[run.options.target]
+    panels = []
+    for column in run.top_features():
+        values = run.df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        stats = [_box_stats(values[(target == label).to_numpy()], str(label)) for label in sorted(target.dropna().unique())]
+        panels.append((f'{column} by {run.options.target}', [s for s in stats if s is not None]))
+    if not panels:
+        return None
+    charts.save_png(charts.box_plots(panels), run.output('box_plots.png'))
+    return ['box_plots.png']
+
+
+@stage('target', 'features')
+def scatter_pairs(run):
+    """Density-binned scatter plots of Time vs Amount and of pairs of the best ranked features against the target."""
+    hue = run.options.target if run.has_classes else None
+    features = run.top_features() if hue else run.profile.numeric_columns
+    pairs = [(features[i], features[i + 1]) for i in range(0, min(len(features), 8) - 1, 2)]
+    if run.profile.is_numeric('Time') and run.profile.is_numeric('Amount'):
+        pairs.insert(0, ('Time', 'Amount'))
+    if not pairs:
+        return None
+    panels = [(run.profile.density(x, y, hue), x, y) for x, y in pairs]
+    charts.save_png(charts.density_grid(panels, hue), run.output('scatter_pairs.png'))
+    return ['scatter_pairs.png']
+
+
+@stage()
+def outliers(run):
+    with open(run.output('outliers.json'), 'w', encoding='utf-8') as f:
+        json.dump(run.profile.outliers(), f, indent=2)
+    return ['outliers.json']
+
+
+@stage('target', 'features', 'treat_columns')
+def treatment(run):
+    """Drops IQR outliers of the treated columns and keeps the target, the treated columns and the best features."""
+    df = run.df
+    keep = np.ones(len(df), dtype=bool)
+    for column in run.options.treat_columns:
+        if column in run.profile.numeric_columns:
+            stats = run.profile.column_stats(column)
+            values = df[column]
+            keep &= ((values >= stats['lower_bound']) & (values <= stats['upper_bound'])).to_numpy()
+    target = run.options.target
+    columns = list(df.columns)
+    if run.has_classes or (target in df.columns and run.profile.is_numeric(target)):
+        treated = [column for column in run.options.treat_columns if column in df.columns and column != target]
+        columns = [target] + treated + run.top_features(exclude=treated)
+    df.loc[keep, columns].to_csv(run.output('treated.csv'), index=False)
+    return ['treated.csv']
+
+
+def process_file(path, directory, options):
+    """Runs every stage that is not up to date for one input and returns a report of what ran."""
+    report = {'input': path, 'output': directory, 'stages': []}
+    start = time.perf_counter()
+    try:
+        run = Run(path, directory, options)
+        for step in STAGES:
+            stage_start = time.perf_counter()
+            if not options.force and run.is_fresh(step):
+                status = 'cached'
+            else:
+                outputs = step.function(run)
+                status = 'skipped' if outputs is None else 'ran'
+                run.record(step, outputs or [])
+            report['stages'].append({'stage': step.name, 'status': status,
+                                     'ms': (time.perf_counter() - stage_start) * 1000})
+        report['rows'] = len(run._df) if run._df is not None else None
+    except Exception as e:
+        report['error'] = f'{type(e).__name__}: {e}'
+    report['ms'] = (time.perf_counter() - start) * 1000
+    return report
+
+
+def expand_inputs(patterns):
+    """CSV files named by paths, glob patterns or directories (searched recursively for partitions)."""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths += sorted(glob.glob(os.path.join(pattern, '**', '*.csv'), recursive=True))
+        else:
+            paths += sorted(glob.glob(pattern)) or [pattern]
+    return list(dict.fromkeys(paths))
+
+
+def output_directories(paths, output_dir):
+    """One output directory per input, named after the file and disambiguated when names repeat."""
+    stems = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+    directories = []
+    for path, name in zip(paths, stems):
+        if stems.count(name) > 1:
+            name = f'{name}-{hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:8]}'
+        directories.append(os.path.join(output_dir, name))
+    return directories
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('inputs', nargs='+', help='CSV files, glob patterns or directories of CSV partitions')
+    parser.add_argument('--output-dir', default='eda-output')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='parallel processes')
+    parser.add_argument('--target', default='Class', help='class column for distribution, box plots and feature selection')
+    parser.add_argument('--features', type=int, default=10, help='features kept in the treated output')
+    parser.add_argument('--treat-columns', nargs='*', default=['Amount'], help='columns whose IQR outliers are removed')
+    parser.add_argument('--bins', type=int, default=50, help='histogram bins')
+    parser.add_argument('--memory-budget-mb', type=int, default=config.MEMORY_BUDGET_MB)
+    parser.add_argument('--force', action='store_true', help='rerun every stage even if its outputs are up to date')
+    args = parser.parse_args(argv)
+
+    paths = expand_inputs(args.inputs)
+    jobs = list(zip(paths, output_directories(paths, args.output_dir)))
+    processes = 1 if args.workers <= 1 or len(jobs) <= 1 else min(args.workers, len(jobs))
+    # Cores left to each file's process for scoring columns in parallel.
+    args.ranking_workers = max(1, (os.cpu_count() or 1) // processes)
+    reports = []
+    if processes == 1:
+        for path, directory in jobs:
+            reports.append(_print_report(process_file(path, directory, args)))
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [executor.submit(process_file, path, directory, args) for path, directory in jobs]
+            for future in as_completed(futures):
+                reports.append(_print_report(future.result()))
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    with open(os.path.join(args.output_dir, 'report.json'), 'w', encoding='utf-8') as f:
+        json.dump(sorted(reports, key=lambda r: r['input']), f, indent=2)
+    failed = [r for r in reports if 'error' in r]
+    print(f"{len(reports) - len(failed)} of {len(reports)} files processed; report in {args.output_dir}/report.json")
+    return 1 if failed else 0
+
+
+def _print_report(report):
+    if 'error' in report:
+        print(f"FAILED {report['input']}: {report['error']}")
+    else:
+        ran = [s['stage'] for s in report['stages'] if s['status'] == 'ran']
+        print(f"{report['input']}: {report['ms']:.0f} ms, ran {', '.join(ran) or 'nothing (up to date)'}")
+    return report
+
+
+if __name__ == '__main__':
+    sys.exit(main())
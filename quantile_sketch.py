@@ -0,0 +1,194 @@
+"""Mergeable KLL quantile sketches: approximate quartiles and percentiles in bounded memory.
+
+A KLL sketch keeps a stack of compactors; level h holds items that each stand for 2**h
+values. When a level overflows it is sorted and every other item (from a random
+offset) is promoted to the next level. Sketches built on separate chunks, threads or
+processes merge by concatenating their levels, and answer any quantile with a rank
+error of about 1.7 / k of the values seen, independent of how many that is.
+"""
+import json
+import math
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_K = 400
+# Each level below the top may hold C times fewer items than the one above it.
+C = 2 / 3
+
+
+class KLLSketch:
+    """Quantile sketch of a stream of numbers; NaNs and infinities are ignored."""
+
+    def __init__(self, k=DEFAULT_K, seed=None):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._rng = np.random.default_rng(seed)
+        self._sorted = None
+
+    def _capacity(self, level):
+        return max(2, math.ceil(self.k * C ** (len(self.levels) - level - 1)))
+
+    def update(self, values):
+        """Adds an array of values."""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if not values.size:
+            return self
+        self.count += values.size
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """Folds another sketch into this one and returns self."""
+        if not other.count:
+            return self
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _compress(self):
+        self._sorted = None
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                items = np.sort(items)
+                # An odd item out stays at this level so weights are preserved exactly.
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                pairs = items[:len(items) - len(keep)]
+                promoted = pairs[self._rng.integers(2)::2]
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                # Adding a level shrinks the capacities below it, so rescan from the bottom.
+                level = 0
+                continue
+            level += 1
+
+    @property
+    def rank_error(self):
+        """Approximate bound on the normalized rank error of quantile answers (0 while exact)."""
+        return 0.0 if len(self.levels) == 1 else 1.7 / self.k
+
+    def _cumulative(self):
+        if self._sorted is None:
+            items = np.concatenate(self.levels)
+            weights = np.concatenate([np.full(len(level_items), 2.0 ** level) for level, level_items in enumerate(self.levels)])
+            order = np.argsort(items, kind='stable')
+            self._sorted = items[order], np.cumsum(weights[order])
+        return self._sorted
+
+    def quantiles(self, qs):
+        """Approximate values at quantiles `qs` (0 to 1), interpolated like `numpy.quantile`."""
+        qs = np.asarray(qs, dtype=np.float64)
+        if not self.count:
+            return np.full(qs.shape, np.nan)
+        if len(self.levels) == 1:
+            return np.quantile(self.levels[0], qs)  # nothing compacted yet: exact
+        items, cumulative = self._cumulative()
+        # Rank of each item's midpoint, scaled to 0..1 like numpy's linear interpolation.
+        total = cumulative[-1]
+        positions = (cumulative - (cumulative - np.concatenate([[0.0], cumulative[:-1]])) / 2) / total
+        result = np.interp(qs, positions, items)
+        return np.where(qs <= 0, self.min, np.where(qs >= 1, self.max, result))
+
+    def quantile(self, q):
+        return float(self.quantiles([q])[0])
+
+    def to_arrays(self, prefix):
+        """The sketch as named arrays, for `np.savez`."""
+        arrays = {f'{prefix}/level{level}': items for level, items in enumerate(self.levels)}
+        arrays[f'{prefix}/meta'] = np.array([self.k, self.count, self.min, self.max, len(self.levels)], dtype=np.float64)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix):
+        k, count, minimum, maximum, levels = arrays[f'{prefix}/meta']
+        sketch = cls(int(k))
+        sketch.count, sketch.min, sketch.max = int(count), float(minimum), float(maximum)
+        sketch.levels = [arrays[f'{prefix}/level{level}'] for level in range(int(levels))]
+        return sketch
+
+
+class ColumnSketches:
+    """One KLL sketch per numerical column of a dataset, fed chunk by chunk."""
+
+    def __init__(self, k=DEFAULT_K):
+        self.k = k
+        self.sketches = {}
+
+    def __contains__(self, column):
+        return column in self.sketches
+
+    def __getitem__(self, column):
+        return self.sketches[column]
+
+    def update(self, df):
+        """Adds the values of every numerical column of a DataFrame chunk."""
+        for column in df.select_dtypes(include=np.number).columns:
+            if column not in self.sketches:
+                self.sketches[column] = KLLSketch(self.k)
+            values = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+            self.sketches[column].update(values)
+        return self
+
+    def merge(self, other):
+        """Folds the sketches of another set of chunks into these and returns self."""
+        for column, sketch in other.sketches.items():
+            if column in self.sketches:
+                self.sketches[column].merge(sketch)
+            else:
+                self.sketches[column] = sketch
+        return self
+
+    def quantiles(self, column, qs):
+        return self.sketches[column].quantiles(qs)
+
+    def describe(self, qs=(0.25, 0.5, 0.75)):
+        """Approximate quantiles of every sketched column, one row per quantile."""
+        return pd.DataFrame(
+            {column: sketch.quantiles(qs) for column, sketch in self.sketches.items()},
+            index=[f'{q:.0%}' for q in qs],
+        )
+
+    def save(self, path):
+        """Writes the sketches atomically as a NumPy `.npz` archive."""
+        arrays = {'columns': np.array(json.dumps(list(self.sketches)))}
+        for i, sketch in enumerate(self.sketches.values()):
+            arrays.update(sketch.to_arrays(str(i)))
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        """Reads sketches written by `save`."""
+        with np.load(path, allow_pickle=False) as arrays:
+            arrays = dict(arrays)
+        columns = json.loads(str(arrays['columns']))
+        sketches = cls()
+        sketches.sketches = {column: KLLSketch.from_arrays(arrays, str(i)) for i, column in enumerate(columns)}
+        if sketches.sketches:
+            sketches.k = next(iter(sketches.sketches.values())).k
+        return sketches
@@ -0,0 +1,95 @@
+"""Read-only SQL over a loaded dataset with an embedded DuckDB engine.
+
+The dataset's DataFrame is registered as the table `data` and scanned in place:
+cached datasets are memory-mapped Feather files, so DuckDB reads their pages
+directly, vectorized and on several threads. Only single SELECT statements are
+accepted, the engine cannot touch files or the network, and at most `max_rows`
+result rows are fetched into Python.
+"""
+import re
+import threading
+
+import duckdb
+import pandas as pd
+
+import config
+
+TABLE = 'data'
+AGGREGATES = ('count', 'sum', 'avg', 'mean', 'min', 'max', 'median', 'stddev', 'variance', 'count_distinct')
+AGGREGATE_PATTERN = re.compile(r'^\s*(\w+)\s*\(\s*(.*?)\s*\)\s*$')
+
+
+class QueryError(ValueError):
+    """Raised for statements the engine refuses to run, or that time out."""
+
+
+def quote(identifier):
+    """A column name as a quoted SQL identifier."""
+    return '"' + str(identifier).replace('"', '""') + '"'
+
+
+class QueryEngine:
+    """A private in-memory DuckDB database over one DataFrame, safe to query from several threads."""
+
+    def __init__(self, df, threads=config.QUERY_THREADS, memory_limit_mb=config.QUERY_MEMORY_MB):
+        self.df = df
+        self._connection = duckdb.connect(':memory:', config={
+            'enable_external_access': False,
+            'threads': threads,
+            'memory_limit': f'{memory_limit_mb}MB',
+            'lock_configuration': True,
+        })
+
+    def query(self, sql, max_rows=config.QUERY_MAX_ROWS, timeout=config.QUERY_TIMEOUT_SECONDS):
+        """Runs one SELECT statement and returns its first `max_rows` rows and whether more were left out."""
+        statements = self._connection.extract_statements(sql)
+        if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+            raise QueryError(f'Only a single SELECT statement over the table "{TABLE}" is allowed.')
+        # Each query gets its own cursor (connections are not shared between threads); the table is registered per cursor.
+        cursor = self._connection.cursor()
+        cursor.register(TABLE, self.df)
+        timer = threading.Timer(timeout, cursor.interrupt)
+        timer.start()
+        try:
+            cursor.execute(sql)
+            columns = [description[0] for description in cursor.description]
+            rows = cursor.fetchmany(max_rows + 1)
+        except duckdb.InterruptException as e:
+            raise QueryError(f'Query cancelled after {timeout} s.') from e
+        finally:
+            timer.cancel()
+            cursor.close()
+        return pd.DataFrame(rows[:max_rows], columns=columns), len(rows) > max_rows
+
+    def group_by_aggregate(self, group_by, aggregates, where=None, max_rows=config.QUERY_MAX_ROWS):
+        """Aggregates columns per group, e.g. group_by=['Class'], aggregates=['count(*)', 'avg(Amount)'].
+
+        Columns and functions are checked against the table and `AGGREGATES`, so no
+        SQL but the optional `where` condition is taken from the caller.
+        """
+        columns = set(self.df.columns)
+        for column in group_by:
+            if column not in columns:
+                raise QueryError(f"Column '{column}' not found.")
+        selected = [quote(column) for column in group_by]
+        for aggregate in aggregates:
+            match = AGGREGATE_PATTERN.match(aggregate)
+            if not match or match.group(1).lower() not in AGGREGATES:
+                raise QueryError(f"Invalid aggregate '{aggregate}'; use function(column) with one of {', '.join(AGGREGATES)}.")
+            function, column = match.group(1).lower(), match.group(2)
+            if column == '*' and function == 'count':
+                expression = 'count(*)'
+            elif column not in columns:
+                raise QueryError(f"Column '{column}' not found.")
+            elif function == 'count_distinct':
+                expression = f'count(DISTINCT {quote(column)})'
+            else:
+                expression = f"{'avg' if function == 'mean' else function}({quote(column)})"
+            selected.append(f'{expression} AS {quote(f"{function}({column})")}')
+        sql = f'SELECT {", ".join(selected)} FROM {TABLE}'
+        if where:
+            sql += f' WHERE {where}'
+        if group_by:
+            keys = ', '.join(quote(column) for column in group_by)
+            sql += f' GROUP BY {keys} ORDER BY {keys}'
+        return self.query(sql, max_rows)
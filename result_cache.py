@@ -0,0 +1,66 @@
+"""Thread-safe, size-bounded LRU cache for computed results."""
+import json
+import threading
+from collections import OrderedDict
+
+MB = 1024 * 1024
+
+
+def normalize_args(args):
+    """Returns a canonical string for a tool's arguments, independent of key order and int/float spelling."""
+    def normalize(value):
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        if isinstance(value, dict):
+            return {k: normalize(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [normalize(v) for v in value]
+        return value
+    return json.dumps(normalize(dict(args)), sort_keys=True, default=str)
+
+
+class ResultCache:
+    """Maps keys to values, evicting the least recently used ones beyond `max_mb`.
+
+    Values are stored with the size given by the caller, so the bound applies to
+    whatever the caller counts (text length, PNG bytes, ...).
+    """
+
+    def __init__(self, max_mb):
+        self.max_bytes = max_mb * MB
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+
+    def put(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Hit/miss counters and current occupancy."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries), 'bytes': self._bytes}
@@ -0,0 +1,172 @@
+"""Single-pass reservoir and stratified sampling of CSV files or DataFrames, with confidence intervals.
+
+Both samplers give every row a random key and keep the rows with the smallest keys
+(bottom-k sampling), which is a uniform sample without replacement and can be
+maintained chunk by chunk in one streaming pass.
+"""
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+import ingestion
+
+# Stratified sampling keeps up to `size` candidate rows per stratum, so the number of strata is capped.
+MAX_STRATA = 100
+
+
+class Sample:
+    """A sample of a dataset together with what is needed to generalize from it.
+
+    `strata` maps each stratum value to {'population': rows in the dataset,
+    'sampled': rows in the sample}; a reservoir sample has a single stratum None.
+    """
+
+    def __init__(self, df, method, strata, by=None):
+        self.df = df
+        self.method = method
+        self.strata = strata
+        self.by = by
+
+    @property
+    def population_rows(self):
+        return sum(s['population'] for s in self.strata.values())
+
+    @property
+    def fraction(self):
+        return len(self.df) / self.population_rows if self.population_rows else 1.0
+
+    def weights(self):
+        """Rows of the dataset represented by each sampled row."""
+        if self.by is None:
+            return pd.Series(1 / self.fraction, index=self.df.index)
+        factors = {value: s['population'] / s['sampled'] for value, s in self.strata.items() if s['sampled']}
+        return self.df[self.by].map(factors).astype(float)
+
+    def describe(self):
+        """Compact description of the sample for reports and tool results."""
+        info = {'method': self.method, 'rows': len(self.df), 'population_rows': self.population_rows,
+                'fraction': round(self.fraction, 4)}
+        if self.by is not None:
+            info['stratified_by'] = self.by
+            info['strata'] = {str(value): s for value, s in self.strata.items()}
+        return info
+
+    def mean_interval(self, column, level=0.95):
+        """Estimated dataset mean of a column and the half-width of its confidence interval.
+
+        Uses the stratified estimator with finite population correction; for a
+        reservoir sample it reduces to the usual interval for a simple random sample.
+        """
+        z = NormalDist().inv_cdf(0.5 + level / 2)
+        groups = [(None, self.df[column])] if self.by is None else self.df.groupby(self.by, observed=True)[column]
+        total = self.population_rows
+        estimate = variance = 0.0
+        for value, values in groups:
+            population = self.strata[value]['population']
+            values = values.dropna().astype(float)
+            if values.empty:
+                continue
+            share = population / total
+            estimate += share * values.mean()
+            if len(values) > 1:
+                variance += share ** 2 * (1 - len(values) / population) * values.var(ddof=1) / len(values)
+        return estimate, z * np.sqrt(variance)
+
+
+def proportion_interval(proportion, sample_rows, population_rows, level=0.95):
+    """Half-width of the confidence interval of a proportion estimated from a simple random sample."""
+    if not sample_rows:
+        return float('nan')
+    z = NormalDist().inv_cdf(0.5 + level / 2)
+    correction = 1 - sample_rows / population_rows if population_rows else 1.0
+    return float(z * np.sqrt(proportion * (1 - proportion) / sample_rows * correction))
+
+
+class _BottomK:
+    """Keeps the `size` rows with the smallest random keys seen so far."""
+
+    def __init__(self, size):
+        self.size = size
+        self.rows = None
+        self.keys = np.empty(0)
+        self.seen = 0
+
+    def add(self, chunk, keys):
+        self.seen += len(chunk)
+        if self.rows is not None and len(self.keys) >= self.size:
+            keep = keys < self.keys.max()
+            chunk, keys = chunk[keep], keys[keep]
+        if len(chunk) == 0:
+            return
+        rows = chunk if self.rows is None else pd.concat([self.rows, chunk])
+        keys = np.concatenate([self.keys, keys])
+        if len(keys) > self.size:
+            smallest = np.argpartition(keys, self.size - 1)[:self.size]
+            rows, keys = rows.iloc[smallest], keys[smallest]
+        self.rows, self.keys = rows, keys
+
+    def take(self, n):
+        """The n rows with the smallest keys, in key (random) order; sort by index for the original order."""
+        if self.rows is None or n <= 0:
+            return None
+        order = np.argsort(self.keys)[:n]
+        return self.rows.iloc[order]
+
+
+def reservoir_sample(source, size, seed=0, chunk_rows=100_000):
+    """Uniform sample of `size` rows from a CSV (path or buffer) or DataFrame in one pass."""
+    rng = np.random.default_rng(seed)
+    reservoir = _BottomK(size)
+    for chunk in ingestion.iter_chunks(source, chunk_rows):
+        reservoir.add(chunk, rng.random(len(chunk)))
+    df = reservoir.take(size)
+    df = df.sort_index() if df is not None else pd.DataFrame()
+    return Sample(df, 'reservoir', {None: {'population': reservoir.seen, 'sampled': len(df)}})
+
+
+def allocate(populations, size, min_per_stratum=0):
+    """Splits `size` rows across strata proportionally, guaranteeing `min_per_stratum` where available."""
+    total = sum(populations.values())
+    if total <= size:
+        return dict(populations)
+    floors = {value: min(min_per_stratum, population) for value, population in populations.items()}
+    remaining = size - sum(floors.values())
+    if remaining <= 0:
+        return floors
+    rest = {value: population - floors[value] for value, population in populations.items()}
+    rest_total = sum(rest.values())
+    shares = {value: remaining * r / rest_total for value, r in rest.items()}
+    counts = {value: floors[value] + int(share) for value, share in shares.items()}
+    # Hand out the rows lost to rounding down, largest remainders first.
+    leftover = size - sum(counts.values())
+    for value in sorted(shares, key=lambda v: shares[v] - int(shares[v]), reverse=True)[:leftover]:
+        counts[value] += 1
+    return counts
+
+
+def stratified_sample(source, size, by, min_per_stratum=0, seed=0, chunk_rows=100_000):
+    """Sample of `size` rows stratified by column `by`, from a CSV (path or buffer) or DataFrame in one pass.
+
+    Rows are allocated to strata in proportion to their size, except that each
+    stratum gets at least `min_per_stratum` rows (or all of its rows), which keeps
+    rare classes such as fraud represented. With a minimum the sample is no longer
+    self-weighting; use `Sample.weights()` or `Sample.mean_interval()` to generalize.
+    """
+    rng = np.random.default_rng(seed)
+    reservoirs = {}
+    for chunk in ingestion.iter_chunks(source, chunk_rows):
+        keys = rng.random(len(chunk))
+        for value, positions in chunk.groupby(by, observed=True, dropna=False).indices.items():
+            if value not in reservoirs:
+                if len(reservoirs) >= MAX_STRATA:
+                    raise ValueError(f"Column '{by}' has more than {MAX_STRATA} distinct values; choose a categorical column.")
+                reservoirs[value] = _BottomK(size)
+            reservoirs[value].add(chunk.iloc[positions], keys[positions])
+
+    counts = allocate({value: r.seen for value, r in reservoirs.items()}, size, min_per_stratum)
+    parts = [reservoirs[value].take(n) for value, n in counts.items()]
+    parts = [part for part in parts if part is not None]
+    df = pd.concat(parts).sort_index() if parts else pd.DataFrame()
+    strata = {value: {'population': r.seen, 'sampled': counts[value]} for value, r in reservoirs.items()}
+    return Sample(df, 'stratified', strata, by=by)
@@ -0,0 +1,71 @@
+"""Startup and rerun timing of the Streamlit app, measured headlessly with Streamlit's AppTest.
+
+Each repeat starts a fresh Python process, so the first run includes every import
+the script triggers, as after a server restart. It reports the time to import
+Streamlit, the first script run (time to first paint) and the median of the
+following reruns (the cost of each interaction), including language switches.
+
+    python startup_benchmark.py --repeats 5 --reruns 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+app = AppTest.from_file('app.py', default_timeout=120)
+app.run()
+first_run = time.perf_counter()
+reruns = []
+for i in range(int(sys.argv[1])):
+    rerun_start = time.perf_counter()
+    if i % 2:
+        app.sidebar.button[i // 2 % 3].click().run()  # language switch
+    else:
+        app.run()
+    reruns.append(time.perf_counter() - rerun_start)
+assert not app.exception, app.exception
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'first_run_ms': (first_run - imported) * 1000,
+    'rerun_ms': [seconds * 1000 for seconds in reruns],
+}))
+'''
+
+
+def measure(reruns):
+    """Runs the app in a fresh process and returns its timings."""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, EDA_LLM_BACKEND='offline', PYTHONWARNINGS='ignore')
+    output = subprocess.run([sys.executable, '-c', CHILD, str(reruns)], cwd=directory, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeats', type=int, default=3, help='fresh processes to measure')
+    parser.add_argument('--reruns', type=int, default=10, help='reruns per process after the first run')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    results = [measure(args.reruns) for _ in range(args.repeats)]
+    print(f"{'repeat':>6} {'import ms':>10} {'first run ms':>13} {'median rerun ms':>16}")
+    for i, r in enumerate(results, start=1):
+        print(f"{i:>6} {r['import_ms']:>10.0f} {r['first_run_ms']:>13.0f} {statistics.median(r['rerun_ms']):>16.1f}")
+    print(f"median first run {statistics.median(r['first_run_ms'] for r in results):.0f} ms, "
+          f"median rerun {statistics.median(ms for r in results for ms in r['rerun_ms']):.1f} ms")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""Out-of-core moments and correlations: mergeable partial states computed chunk by chunk.
+
+Each chunk is reduced to counts, means, co-moments, minima and maxima over pairwise
+complete observations (the same rows `DataFrame.corr()` uses). Partial states merge
+exactly with the parallel Welford update of Chan et al., so chunks can be reduced in
+any order and on several threads while memory stays bounded by a few chunks.
+"""
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+import config
+import ingestion
+
+
+class Moments:
+    """Mergeable first and second moments of a fixed set of numerical columns.
+
+    `count[i, j]` is the number of rows where columns i and j are both present,
+    `mean[i, j]` the mean of column i over those rows, `square[i, j]` the sum of squared
+    deviations of column i from that mean and `comoment[i, j]` the sum of products of
+    deviations; the diagonals hold the per-column values.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        p = len(self.columns)
+        self.count = np.zeros((p, p))
+        self.mean = np.zeros((p, p))
+        self.square = np.zeros((p, p))
+        self.comoment = np.zeros((p, p))
+        self.min = np.full(p, np.inf)
+        self.max = np.full(p, -np.inf)
+
+    @classmethod
+    def from_frame(cls, df, columns=None):
+        """Moments of the numerical columns of a DataFrame (or of `columns`, coerced to numbers)."""
+        columns = list(df.select_dtypes(include=np.number).columns) if columns is None else list(columns)
+        moments = cls(columns)
+        values = np.column_stack([
+            pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+            for column in columns
+        ]) if columns else np.empty((len(df), 0))
+        present = ~np.isnan(values)
+        if not present.any():
+            return moments
+        # Shift by the column means first so the products below do not lose precision.
+        with np.errstate(invalid='ignore', divide='ignore'):
+            shift = np.nansum(values, axis=0) / present.sum(axis=0)
+        filled = np.where(present, values - np.nan_to_num(shift), 0.0)
+        weights = present.astype(np.float64)
+        count = weights.T @ weights
+        sums = filled.T @ weights  # sums[i, j]: sum of shifted column i over rows where j is present
+        with np.errstate(invalid='ignore', divide='ignore'):
+            local_mean = np.where(count > 0, sums / count, 0.0)
+        moments.count = count
+        moments.mean = local_mean + np.nan_to_num(shift)[:, None]
+        moments.square = (filled ** 2).T @ weights - local_mean * sums
+        moments.comoment = filled.T @ filled - local_mean * sums.T
+        moments.min = np.where(present.any(axis=0), np.nanmin(np.where(present, values, np.inf), axis=0), np.inf)
+        moments.max = np.where(present.any(axis=0), np.nanmax(np.where(present, values, -np.inf), axis=0), -np.inf)
+        return moments
+
+    def merge(self, other):
+        """Folds another partial state over the same columns into this one and returns self."""
+        if other.columns != self.columns:
+            raise ValueError('Cannot merge moments of different columns.')
+        total = self.count + other.count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = other.mean - self.mean
+            share = np.where(total > 0, other.count / total, 0.0)
+            weight = np.where(total > 0, self.count * other.count / total, 0.0)
+        self.square = self.square + other.square + delta ** 2 * weight
+        self.comoment = self.comoment + other.comoment + delta * delta.T * weight
+        self.mean = self.mean + delta * share
+        self.count = total
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        return self
+
+    def covariance(self):
+        """Sample covariance matrix over pairwise complete observations."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            covariance = np.where(self.count > 1, self.comoment / (self.count - 1), np.nan)
+        return pd.DataFrame(covariance, index=self.columns, columns=self.columns)
+
+    def correlation(self):
+        """Pearson correlation matrix, matching `DataFrame.corr()`."""
+        # Each pair is normalized by the variances over its own pairwise complete rows.
+        with np.errstate(invalid='ignore', divide='ignore'):
+            correlation = np.where(self.count > 1, self.comoment / np.sqrt(self.square * self.square.T), np.nan)
+        correlation = np.clip(correlation, -1, 1)
+        np.fill_diagonal(correlation, np.where(np.diag(self.count) > 1, 1.0, np.nan))
+        return pd.DataFrame(correlation, index=self.columns, columns=self.columns)
+
+    def describe(self):
+        """Count, mean, std, min and max of each column in the layout of `DataFrame.describe()`."""
+        count = np.diag(self.count)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.where(count > 1, np.sqrt(np.diag(self.comoment) / (count - 1)), np.nan)
+        present = count > 0
+        return pd.DataFrame(
+            [count, np.where(present, np.diag(self.mean), np.nan), std,
+             np.where(present, self.min, np.nan), np.where(present, self.max, np.nan)],
+            index=['count', 'mean', 'std', 'min', 'max'], columns=self.columns,
+        )
+
+
+def compute(source, columns=None, chunk_rows=100_000, workers=config.TOOL_WORKERS):
+    """Moments of a CSV (path or buffer) or DataFrame, reduced chunk by chunk on a thread pool.
+
+    The columns are the numerical columns of the first chunk unless given. At most
+    two chunks per worker are in flight, so memory does not grow with the file size.
+    """
+    # Chunks are only reduced, so they are read as float64: downcasting would save nothing here.
+    chunks = ingestion.iter_chunks(source, chunk_rows, downcast=False)
+    first = next(chunks, None)
+    if first is None:
+        return Moments(columns or [])
+    columns = list(first.select_dtypes(include=np.number).columns) if columns is None else list(columns)
+    total = Moments(columns)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(Moments.from_frame, first, columns)}
+        for chunk in chunks:
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    total.merge(future.result())
+            pending.add(executor.submit(Moments.from_frame, chunk, columns))
+        for future in pending:
+            total.merge(future.result())
+    return total
+
+
+if __name__ == '__main__':
+    moments = compute(sys.argv[1])
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(moments.describe())
+        print()
+        print(moments.correlation().round(3))
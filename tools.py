@@ -0,0 +1,311 @@
+"""EDA tools exposed to the model and the registry that declares them for function calling."""
+import inspect
+import typing
+
+import pandas as pd
+from google.generativeai.types import FunctionDeclaration, Tool
+
+import charts
+import config
+import dataset_profile
+import feature_ranking
+import query_engine
+import sampling
+
+SCHEMA_TYPES = {str: 'string', int: 'integer', float: 'number', bool: 'boolean'}
+
+
+class Dataset:
+    """A loaded dataset as seen by the tools: its frame, content hash and statistics profile.
+
+    Large datasets also carry a `sampling.Sample` and its profile; tools answer from the
+    sample unless exact results are requested.
+    """
+
+    def __init__(self, df, key, profile, sample=None, sample_profile=None):
+        self.df = df
+        self.key = key
+        self.profile = profile
+        self.sample = sample
+        self.sample_profile = sample_profile
+        self._engine = None
+
+    @property
+    def engine(self):
+        """The `query_engine.QueryEngine` over the full frame, created on the first query."""
+        if self._engine is None:
+            self._engine = query_engine.QueryEngine(self.df)
+        return self._engine
+
+    def view(self, exact=False):
+        """The dataset to compute on: its sample, or the full dataset when exact or not sampled."""
+        if exact or self.sample is None:
+            return self
+        return Dataset(self.sample.df, f'{self.key}:sample', self.sample_profile)
+
+
+class ToolResult(typing.NamedTuple):
+    """Output of a tool call: the content sent back to the model and an optional PNG chart to display."""
+    content: typing.Any
+    chart: bytes = None
+
+
+class ToolRegistry:
+    """Collects tool functions and builds their function declarations from signatures and type hints.
+
+    Every tool takes the `Dataset` as its first argument; the remaining parameters are
+    the ones declared to the model.
+    """
+
+    def __init__(self):
+        self.functions = {}
+        self._tool = None
+
+    def register(self, function):
+        """Decorator adding a tool function to the registry."""
+        self.functions[function.__name__] = function
+        self._tool = None
+        return function
+
+    def __contains__(self, name):
+        return name in self.functions
+
+    @staticmethod
+    def _base_type(annotation):
+        if typing.get_origin(annotation) is typing.Union:
+            annotation = next(arg for arg in typing.get_args(annotation) if arg is not type(None))
+        return annotation
+
+    @classmethod
+    def _schema_type(cls, annotation):
+        return SCHEMA_TYPES.get(cls._base_type(annotation), 'string')
+
+    def declaration(self, function):
+        """Builds the FunctionDeclaration of a tool."""
+        hints = typing.get_type_hints(function)
+        parameters = list(inspect.signature(function).parameters.values())[1:]
+        properties = {p.name: {'type': self._schema_type(hints.get(p.name, str))} for p in parameters}
+        required = [p.name for p in parameters if p.default is inspect.Parameter.empty]
+        schema = None
+        if properties:
+            schema = {'type': 'object', 'properties': properties}
+            if required:
+                schema['required'] = required
+        return FunctionDeclaration(name=function.__name__, description=inspect.getdoc(function), parameters=schema)
+
+    @property
+    def tool(self):
+        """The `Tool` declaring every registered function, built once."""
+        if self._tool is None:
+            self._tool = Tool(function_declarations=[self.declaration(f) for f in self.functions.values()])
+        return self._tool
+
+    def coerce_args(self, function, args):
+        """Converts the model's arguments to the tool's type hints; Gemini sends every number as a float."""
+        hints = typing.get_type_hints(function)
+        coerced = {}
+        for name, value in args.items():
+            annotation = self._base_type(hints.get(name))
+            if value is None or annotation not in SCHEMA_TYPES:
+                coerced[name] = value
+            elif annotation is bool and isinstance(value, str):
+                # bool() is true for any non-empty string, 'false' included.
+                coerced[name] = value.strip().lower() == 'true'
+            else:
+                coerced[name] = annotation(value)
+        return coerced
+
+    def dispatch(self, name, dataset, args):
+        """Calls a tool with the dataset and the model's arguments, returning a ToolResult."""
+        function = self.functions[name]
+        result = function(dataset, **self.coerce_args(function, args))
+        return result if isinstance(result, ToolResult) else ToolResult(result)
+
+
+registry = ToolRegistry()
+
+
+def _sample_note(sample):
+    info = sample.describe()
+    return (f"Computed on a {info['method']} sample of {info['rows']:,} of {info['population_rows']:,} rows "
+            f"({info['fraction']:.1%}); call again with exact=true for results over all rows.")
+
+
+def _approximation_note(profile):
+    """Warns that quartiles (and IQR bounds) come from quantile sketches, or returns None when they are exact."""
+    error = profile.quartile_rank_error()
+    if not error:
+        return None
+    return (f"Quartiles and IQR bounds are approximate, read from quantile sketches built at load time: "
+            f"each is within {error:.2%} of the rows of its exact rank.")
+
+
+def _estimate_outliers(stats, sample):
+    """Scales sample outlier counts to the dataset and adds the 95% confidence interval of the percentage."""
+    half_width = sampling.proportion_interval(stats['percent'] / 100, len(sample.df), sample.population_rows)
+    return {
+        **stats,
+        'estimated_outliers': round(stats['percent'] / 100 * sample.population_rows),
+        'percent_ci95': round(half_width * 100, 4),
+    }
+
+
+# --- EDA Tools ---
+@registry.register
+def get_data_summary(dataset: Dataset, exact: bool = False):
+    """Provides a statistical summary of the numerical columns.
+
+    Large datasets are summarized on a random sample with 95% confidence intervals for the means;
+    set exact to true to compute over all rows (quartiles of large datasets are then approximate,
+    with the rank error reported).
+    """
+    view = dataset.view(exact)
+    # One row per column, so a summary cut to the token budget drops whole columns rather than statistics.
+    summary = {'rows': len(dataset.df), 'statistics': view.profile.describe().T}
+    if view is dataset:
+        if note := _approximation_note(view.profile):
+            summary['note'] = note
+        return summary
+    summary['estimated_means_ci95'] = pd.DataFrame(
+        [dataset.sample.mean_interval(column) for column in view.profile.numeric_columns],
+        index=view.profile.numeric_columns, columns=['mean', 'plus_minus'],
+    )
+    summary['sample'] = _sample_note(dataset.sample)
+    return summary
+
+
+@registry.register
+def plot_histogram(dataset: Dataset, column_name: str, exact: bool = False):
+    """Generates a histogram for a given column. Large datasets are plotted from a random sample unless exact is true."""
+    if column_name not in dataset.df.columns: return f"Error: Column '{column_name}' not found."
+    if not dataset.profile.is_numeric(column_name): return f"Error: Column '{column_name}' is not a valid numerical column."
+    view = dataset.view(exact)
+    bins = view.profile.histogram(column_name)
+    title = f'Histogram of {column_name}' if view is dataset else f'Histogram of {column_name} (sample of {len(view.df):,} rows)'
+    chart = charts.render(view.key, ('histogram', column_name), lambda: charts.histogram(*bins, title=title))
+    message = f"Histogram for {column_name} displayed."
+    return ToolResult(message if view is dataset else f"{message} {_sample_note(dataset.sample)}", chart)
+
+
+@registry.register
+def plot_scatter(dataset: Dataset, x_column: str, y_column: str, hue_column: str = None):
+    """Generates a scatter plot of two numerical columns, optionally colored by a categorical column such as a class label.
+
+    Dense classes are drawn as binned densities and small classes (such as fraud) as individual
+    points, so the plot always covers every row.
+    """
+    for column in (x_column, y_column):
+        if column not in dataset.df.columns or not dataset.profile.is_numeric(column):
+            return f"Error: Column '{column}' is not a valid numerical column."
+    if hue_column:
+        if hue_column not in dataset.df.columns: return f"Error: Column '{hue_column}' not found."
+        if dataset.df[hue_column].nunique() > dataset_profile.DENSITY_MAX_CLASSES:
+            return f"Error: Column '{hue_column}' has more than {dataset_profile.DENSITY_MAX_CLASSES} distinct values."
+    density = dataset.profile.density(x_column, y_column, hue_column)
+    chart = charts.render(
+        dataset.key, ('scatter', x_column, y_column, hue_column),
+        lambda: charts.density_scatter(density, x_column, y_column, hue_column),
+    )
+    return ToolResult(f"Scatter plot of {y_column} vs {x_column} over {density['rows']:,} rows displayed.", chart)
+
+
+@registry.register
+def plot_correlation_matrix(dataset: Dataset, exact: bool = False):
+    """Calculates and visualizes the correlation matrix. Large datasets use a random sample unless exact is true."""
+    if len(dataset.profile.numeric_columns) < 2: return "Not enough numerical columns for a correlation matrix."
+    view = dataset.view(exact)
+    title = 'Correlation matrix' if view is dataset else f'Correlation matrix (sample of {len(view.df):,} rows)'
+    chart = charts.render(
+        view.key, ('correlation',),
+        lambda: charts.correlation_heatmap(view.profile.correlation(), title=title),
+    )
+    message = "Correlation matrix displayed."
+    return ToolResult(message if view is dataset else f"{message} {_sample_note(dataset.sample)}", chart)
+
+
+@registry.register
+def detect_outliers(dataset: Dataset, column_name: str = None, exact: bool = False):
+    """Detects outliers with the IQR method in a numerical column, or in every numerical column when no column is given.
+
+    Returns outlier counts, percentages, IQR bounds and the most extreme values. Large datasets
+    are scanned on a random sample, with estimated counts and 95% confidence intervals for the
+    percentages; set exact to true to scan all rows (IQR bounds of large datasets are then
+    approximate, with the rank error reported).
+    """
+    if column_name and (column_name not in dataset.df.columns or not dataset.profile.is_numeric(column_name)):
+        return f"Error: Column '{column_name}' is not a valid numerical column."
+    view = dataset.view(exact)
+    scan = view.profile.outliers()
+    if view is not dataset:
+        scan = {column: _estimate_outliers(stats, dataset.sample) for column, stats in scan.items()}
+    if column_name:
+        result = {'column': column_name, **scan[column_name]}
+    else:
+        flagged = sorted((column for column in scan if scan[column]['outliers']), key=lambda c: -scan[c]['outliers'])
+        result = {
+            'rows': len(dataset.df),
+            'columns_with_outliers': [{'column': column, **scan[column]} for column in flagged],
+            'columns_without_outliers': [column for column in scan if not scan[column]['outliers']],
+        }
+    if view is not dataset:
+        result['sample'] = {**dataset.sample.describe(), 'note': _sample_note(dataset.sample)}
+    elif note := _approximation_note(view.profile):
+        result['note'] = note
+    return result
+
+
+def _query_result(rows, truncated):
+    result = {'result': rows}
+    if truncated:
+        result['note'] = f"Only the first {len(rows)} rows were fetched; aggregate or filter further for the rest."
+    return result
+
+
+@registry.register
+def run_query(dataset: Dataset, sql: str):
+    """Runs a read-only SQL SELECT statement (DuckDB dialect) over the full dataset, available as the table "data".
+
+    Use it to filter, join with itself, aggregate or rank rows beyond what the other tools offer; quote
+    column names with double quotes when needed. Only the first result rows are returned, so aggregate or
+    add LIMIT instead of selecting raw rows.
+    """
+    return _query_result(*dataset.engine.query(sql))
+
+
+@registry.register
+def group_by_aggregate(dataset: Dataset, group_by: str, aggregates: str = 'count(*)', where: str = None):
+    """Aggregates columns over the full dataset per group of one or more columns.
+
+    group_by is a comma-separated list of columns (empty for a single overall row). aggregates is a
+    comma-separated list of function(column) with functions count, sum, avg, mean, min, max, median,
+    stddev, variance or count_distinct, e.g. "count(*), avg(Amount), max(Amount)". where is an optional
+    SQL condition such as "Amount > 100".
+    """
+    group_columns = [column.strip() for column in group_by.split(',') if column.strip()]
+    aggregate_list = [aggregate.strip() for aggregate in aggregates.split(',') if aggregate.strip()]
+    return _query_result(*dataset.engine.group_by_aggregate(group_columns, aggregate_list, where))
+
+
+@registry.register
+def rank_features(dataset: Dataset, target_column: str, top_n: int = 10, exact: bool = False):
+    """Ranks the numerical columns by how well each one alone separates the classes of a target column such as Class.
+
+    Scores every column with point-biserial correlation, mutual information and ROC AUC (the
+    first and last for binary targets only) and ranks them by their mean rank; use it to choose
+    features. Large datasets are scored on a sample stratified by the target unless exact is true.
+    """
+    if target_column not in dataset.df.columns: return f"Error: Column '{target_column}' not found."
+    if dataset.df[target_column].nunique() > feature_ranking.MAX_CLASSES:
+        return f"Error: Column '{target_column}' has more than {feature_ranking.MAX_CLASSES} distinct values; choose a class column."
+    sample = None
+    # Mutual information is the slow score, so sampling starts well below the size that samples the other tools.
+    if not exact and len(dataset.df) > config.SAMPLE_ROWS:
+        sample = feature_ranking.class_sample(dataset.df, target_column, config.SAMPLE_ROWS)
+    ranking = feature_ranking.rank_features(dataset.df if sample is None else sample.df, target_column)
+    result = {'target': target_column, 'ranking': ranking.drop(columns='rows').head(top_n),
+              'other_features': list(ranking.index[top_n:])}
+    if sample is not None:
+        result['sample'] = {**sample.describe(), 'note': (
+            f"{_sample_note(sample)} Rare classes are over-represented, so point-biserial and mutual "
+            "information values are only comparable between features; AUC is unaffected.")}
+    return result
@@ -0,0 +1,114 @@
+"""Lightweight performance tracing: timed spans grouped per chat turn or upload, exported as JSONL.
+
+Usage:
+    with tracing.Trace('turn', model='gemini-1.5-flash'):
+        with tracing.span('llm.send_message') as record:
+            ...
+            record['prompt_tokens'] = 1234
+
+Spans opened outside a trace are not recorded. `python tracing.py [trace file]`
+prints p50/p95 durations per span name.
+"""
+import contextlib
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+
+import config
+
+_current = contextvars.ContextVar('trace', default=None)
+_write_lock = threading.Lock()
+
+
+class Trace:
+    """Collects the spans recorded while it is the active trace."""
+
+    def __init__(self, kind, **attrs):
+        self.kind = kind
+        self.attrs = attrs
+        self.spans = []
+        self.duration_ms = None
+        self._start = time.perf_counter()
+        self._timestamp = time.time()
+        self._lock = threading.Lock()
+        self._token = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+        if exc is not None:
+            self.attrs['error'] = repr(exc)
+        _current.reset(self._token)
+        if config.TRACE_FILE:
+            self.write(config.TRACE_FILE)
+        return False
+
+    def add(self, record):
+        with self._lock:
+            self.spans.append(record)
+
+    def to_dict(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s['start_ms'])
+        return {'kind': self.kind, 'timestamp': self._timestamp, 'duration_ms': self.duration_ms,
+                **self.attrs, 'spans': spans}
+
+    def write(self, path):
+        """Appends the trace as one JSON line to `path`."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        line = json.dumps(self.to_dict(), default=str)
+        with _write_lock, open(path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    """Times a block as a span of the active trace; yields a dict for extra attributes."""
+    trace = _current.get()
+    record = {'name': name, **attrs}
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        if trace is not None:
+            record['start_ms'] = (start - trace._start) * 1000
+            record['duration_ms'] = (time.perf_counter() - start) * 1000
+            trace.add(record)
+
+
+def submit(executor, function, *args):
+    """Submits `function` to an executor so its spans are recorded in the caller's trace."""
+    return executor.submit(contextvars.copy_context().run, function, *args)
+
+
+def summarize(path=None):
+    """Returns count, p50 and p95 duration (ms) per trace kind and span name in a trace file."""
+    import numpy as np
+    durations = defaultdict(list)
+    with open(path or config.TRACE_FILE, encoding='utf-8') as f:
+        for line in f:
+            trace = json.loads(line)
+            durations[trace['kind']].append(trace['duration_ms'])
+            for record in trace['spans']:
+                durations[record['name']].append(record['duration_ms'])
+    return {
+        name: {'count': len(values), 'p50': float(np.percentile(values, 50)), 'p95': float(np.percentile(values, 95))}
+        for name, values in sorted(durations.items())
+    }
+
+
+if __name__ == '__main__':
+    summary = summarize(sys.argv[1] if len(sys.argv) > 1 else None)
+    print(f"{'span':<32} {'count':>7} {'p50 ms':>10} {'p95 ms':>10}")
+    for name, stats in summary.items():
+        print(f"{name:<32} {stats['count']:>7} {stats['p50']:>10.1f} {stats['p95']:>10.1f}")
@@ -0,0 +1,66 @@
+"""Background warm-up: computes a dataset's most likely first analyses right after upload.
+
+The statistics are computed through the dataset's `DatasetProfile`, whose memo
+keeps every result and makes a tool asking for a statistic that is still being
+computed wait for it instead of starting again. Tasks run one at a time in
+priority order, and a warm-up can be cancelled between tasks, e.g. when the
+session switches to another dataset.
+"""
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+
+_executor = ThreadPoolExecutor(max_workers=max(config.WARMUP_WORKERS, 1), thread_name_prefix='warmup')
+
+
+def tasks(profile):
+    """(name, function) pairs for the statistics the first questions usually need, most likely first."""
+    columns = profile.numeric_columns
+    # Column statistics include the quartiles and IQR bounds, and make up the summary.
+    yield from ((f'column_stats:{column}', functools.partial(profile.column_stats, column)) for column in columns)
+    yield 'describe', profile.describe
+    if len(columns) >= 2:
+        yield 'correlation', profile.correlation
+    yield 'outliers', profile.outliers
+    yield from ((f'histogram:{column}', functools.partial(profile.histogram, column)) for column in columns)
+
+
+class WarmUp:
+    """A queued or running warm-up of one profile."""
+
+    def __init__(self, profile):
+        self.tasks = list(tasks(profile))
+        self.done = 0
+        self.errors = []
+        self._cancelled = threading.Event()
+        self._future = _executor.submit(self._run)
+
+    def _run(self):
+        for name, compute in self.tasks:
+            if self._cancelled.is_set():
+                return
+            try:
+                compute()
+            except Exception as e:
+                # Nothing is memoized on failure, so the tool call needing it recomputes and reports the error.
+                self.errors.append(f'{name}: {e!r}')
+            self.done += 1
+
+    def cancel(self):
+        """Stops before the next task; a task already running finishes and stays memoized."""
+        self._cancelled.set()
+        self._future.cancel()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def status(self):
+        return {'done': self.done, 'total': len(self.tasks), 'cancelled': self.cancelled, 'errors': len(self.errors)}
+
+
+def start(profile):
+    """Queues the warm-up of a profile, or returns None when warm-up is disabled."""
+    return WarmUp(profile) if config.WARMUP_WORKERS else None